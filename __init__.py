@@ -92,40 +92,10 @@ _event = _dg_singleton._event_dg
 _bottom = _dg_singleton._bottom_dg
 
 
-from streamlit.elements.dialog_decorator import (
-    dialog_decorator as _dialog_decorator,
-    experimental_dialog_decorator as _experimental_dialog_decorator,
-)
-from streamlit.runtime.caching import (
-    cache_resource as _cache_resource,
-    cache_data as _cache_data,
-    cache as _cache,
-)
-from streamlit.runtime.connection_factory import (
-    connection_factory as _connection,
-)
-from streamlit.runtime.fragment import (
-    experimental_fragment as _experimental_fragment,
-    fragment as _fragment,
-)
 from streamlit.runtime.metrics_util import gather_metrics as _gather_metrics
-from streamlit.runtime.secrets import secrets_singleton as _secrets_singleton
-from streamlit.runtime.context import ContextProxy as _ContextProxy
-from streamlit.runtime.state import (
-    SessionStateProxy as _SessionStateProxy,
-    QueryParamsProxy as _QueryParamsProxy,
-)
-from streamlit.user_info import (
-    UserInfoProxy as _UserInfoProxy,
-    login as _login,
-    logout as _logout,
-)
-from streamlit.commands.experimental_query_params import (
-    get_query_params as _get_query_params,
-    set_query_params as _set_query_params,
-)
 
-import streamlit.column_config as _column_config
+import importlib as _importlib
+from typing import TYPE_CHECKING as _TYPE_CHECKING
 
 # Modules that the user should have access to. These are imported with the "as" syntax
 # and the same name; note that renaming the import with "as" does not make it an
@@ -160,8 +130,6 @@ def _update_logger() -> None:
 # in an alternative config.
 _config.on_config_parsed(_update_logger, True)
 
-secrets = _secrets_singleton
-
 altair_chart = _main.altair_chart
 area_chart = _main.area_chart
 audio = _main.audio
@@ -249,59 +217,173 @@ toast = _event.toast
 get_option = _gather_metrics("get_option", _config.get_option)
 set_option = _gather_metrics("set_option", _config.set_user_option)
 
-# Session State
-session_state = _SessionStateProxy()
-
-query_params = _QueryParamsProxy()
-
-context = _ContextProxy()
-
-# Caching
-cache_data = _cache_data
-cache_resource = _cache_resource
-# `st.cache` is deprecated and should be removed soon
-cache = _cache
-
-# Namespaces
-column_config = _column_config
-
-# Connection
-connection = _connection
-
-# Fragment and dialog
-dialog = _dialog_decorator
-fragment = _fragment
-
-
-# Auth
-login = _login
-logout = _logout
-
 # Experimental APIs
 experimental_audio_input = _main.experimental_audio_input
-experimental_dialog = _experimental_dialog_decorator
-experimental_fragment = _experimental_fragment
-experimental_user = _UserInfoProxy()
 
 _EXPERIMENTAL_QUERY_PARAMS_DEPRECATE_MSG = "Refer to our [docs page](https://docs.streamlit.io/develop/api-reference/caching-and-state/st.query_params) for more information."
 
-experimental_get_query_params = _deprecate_func_name(
-    _get_query_params,
-    "experimental_get_query_params",
-    "2024-04-11",
-    _EXPERIMENTAL_QUERY_PARAMS_DEPRECATE_MSG,
-    name_override="query_params",
-)
-experimental_set_query_params = _deprecate_func_name(
-    _set_query_params,
-    "experimental_set_query_params",
-    "2024-04-11",
-    _EXPERIMENTAL_QUERY_PARAMS_DEPRECATE_MSG,
-    name_override="query_params",
-)
 
+# Subsystems that are not needed to start a script are loaded on first access
+# (PEP 562), so worker processes, CLIs and tests that only touch a few `st.*`
+# names don't pay for importing all of them. Each entry maps a public name to
+# the module and attribute it resolves to.
+_LAZY_ATTRIBUTES = {
+    # Caching
+    "cache_data": ("streamlit.runtime.caching", "cache_data"),
+    "cache_resource": ("streamlit.runtime.caching", "cache_resource"),
+    # `st.cache` is deprecated and should be removed soon
+    "cache": ("streamlit.runtime.caching", "cache"),
+    # Connection
+    "connection": ("streamlit.runtime.connection_factory", "connection_factory"),
+    # Fragment and dialog
+    "dialog": ("streamlit.elements.dialog_decorator", "dialog_decorator"),
+    "fragment": ("streamlit.runtime.fragment", "fragment"),
+    "experimental_dialog": (
+        "streamlit.elements.dialog_decorator",
+        "experimental_dialog_decorator",
+    ),
+    "experimental_fragment": ("streamlit.runtime.fragment", "experimental_fragment"),
+    # Secrets
+    "secrets": ("streamlit.runtime.secrets", "secrets_singleton"),
+    # Auth
+    "login": ("streamlit.user_info", "login"),
+    "logout": ("streamlit.user_info", "logout"),
+    # Namespaces
+    "column_config": ("streamlit.column_config", None),
+}
+
+
+def _make_session_state():
+    from streamlit.runtime.state import SessionStateProxy
 
-# make it possible to call streamlit.components.v1.html etc. by importing it here
-# import in the very end to avoid partially-initialized module import errors, because
-# streamlit.components.v1 also uses some streamlit imports
-import streamlit.components.v1  # noqa: F401
+    return SessionStateProxy()
+
+
+def _make_query_params():
+    from streamlit.runtime.state import QueryParamsProxy
+
+    return QueryParamsProxy()
+
+
+def _make_context():
+    from streamlit.runtime.context import ContextProxy
+
+    return ContextProxy()
+
+
+def _make_experimental_user():
+    from streamlit.user_info import UserInfoProxy
+
+    return UserInfoProxy()
+
+
+def _make_experimental_get_query_params():
+    from streamlit.commands.experimental_query_params import get_query_params
+
+    return _deprecate_func_name(
+        get_query_params,
+        "experimental_get_query_params",
+        "2024-04-11",
+        _EXPERIMENTAL_QUERY_PARAMS_DEPRECATE_MSG,
+        name_override="query_params",
+    )
+
+
+def _make_experimental_set_query_params():
+    from streamlit.commands.experimental_query_params import set_query_params
+
+    return _deprecate_func_name(
+        set_query_params,
+        "experimental_set_query_params",
+        "2024-04-11",
+        _EXPERIMENTAL_QUERY_PARAMS_DEPRECATE_MSG,
+        name_override="query_params",
+    )
+
+
+def _make_components():
+    # make it possible to call streamlit.components.v1.html etc. after a plain
+    # `import streamlit`
+    import streamlit.components.v1  # noqa: F401
+
+    return _importlib.import_module("streamlit.components")
+
+
+# Names whose value is an object created once on first access
+_LAZY_FACTORIES = {
+    # Session State
+    "session_state": _make_session_state,
+    "query_params": _make_query_params,
+    "context": _make_context,
+    # Experimental APIs
+    "experimental_user": _make_experimental_user,
+    "experimental_get_query_params": _make_experimental_get_query_params,
+    "experimental_set_query_params": _make_experimental_set_query_params,
+    "components": _make_components,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        module = _importlib.import_module(module_name)
+        value = module if attribute is None else getattr(module, attribute)
+    elif name in _LAZY_FACTORIES:
+        value = _LAZY_FACTORIES[name]()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache the value so later lookups are plain module attribute reads.
+    # setdefault keeps the first object if two threads race here.
+    return globals().setdefault(name, value)
+
+
+# `streamlit.components` is already imported by the elements above, which binds
+# the bare package here and would bypass __getattr__. Drop it so the first
+# `st.components` access goes through _make_components and loads v1.
+globals().pop("components", None)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_FACTORIES))
+
+
+if _TYPE_CHECKING:
+    # Static type checkers don't run __getattr__, so spell out the lazy names
+    from streamlit.runtime.caching import (
+        cache_resource as cache_resource,
+        cache_data as cache_data,
+        cache as cache,
+    )
+    from streamlit.runtime.connection_factory import (
+        connection_factory as connection,
+    )
+    from streamlit.runtime.fragment import (
+        experimental_fragment as experimental_fragment,
+        fragment as fragment,
+    )
+    from streamlit.elements.dialog_decorator import (
+        dialog_decorator as dialog,
+        experimental_dialog_decorator as experimental_dialog,
+    )
+    from streamlit.runtime.secrets import secrets_singleton as secrets
+    from streamlit.runtime.context import ContextProxy as _ContextProxy
+    from streamlit.runtime.state import (
+        SessionStateProxy as _SessionStateProxy,
+        QueryParamsProxy as _QueryParamsProxy,
+    )
+    from streamlit.user_info import (
+        UserInfoProxy as _UserInfoProxy,
+        login as login,
+        logout as logout,
+    )
+    from streamlit.commands.experimental_query_params import (
+        get_query_params as experimental_get_query_params,
+        set_query_params as experimental_set_query_params,
+    )
+    import streamlit.column_config as column_config
+    import streamlit.components as components
+
+    session_state: _SessionStateProxy
+    query_params: _QueryParamsProxy
+    context: _ContextProxy
+    experimental_user: _UserInfoProxy
@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-import random
+
+import engine
+import metrics
+import perf_panel
 
 # Set page title
 st.set_page_config(page_title="Google Sheet Data Viewer", layout="wide")
@@ -57,32 +59,30 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Function to get data from Google Sheet
+# Function to get data from Google Sheet (or a snapshot in FOOD_SNAPSHOT_DIR)
 @st.cache_data(ttl=600)  # Cache data for 10 minutes
 def load_data(sheet_url, skip_first_row=True):
     try:
-        # Get sheet ID from URL
-        if "spreadsheets/d/" in sheet_url:
-            sheet_id = sheet_url.split("spreadsheets/d/")[1].split("/")[0]
-        else:
-            st.error("Invalid Google Sheet URL")
-            return None
-        
-        # For public sheets, we can use the export CSV link directly
-        csv_export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        
-        if skip_first_row:
-            # Skip the first row (row 1) and use the second row (row 2) as header
-            df = pd.read_csv(csv_export_url, skiprows=1)
-        else:
-            # Use the first row as header (default behavior)
-            df = pd.read_csv(csv_export_url)
-            
-        return df
+        if not engine.is_sheet_url(sheet_url):
+            # Visitors may only open files from the snapshot folder
+            sheet_url = engine.snapshot_path(sheet_url)
+        return engine.load_source(sheet_url, skip_first_row)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
+# Column profile and option lists are cached per sheet, so only the
+# columns someone filters by ever have their options computed
+@st.cache_data(ttl=600)
+def column_profile(sheet_url, skip_first_row, max_unique):
+    with metrics.span("classify"):
+        return engine.classify_columns(load_data(sheet_url, skip_first_row), max_unique, detect_numeric=False)
+
+@st.cache_data(ttl=600)
+def column_options(sheet_url, skip_first_row, column, limit=None):
+    with metrics.span("filter_options"):
+        return engine.filter_options(load_data(sheet_url, skip_first_row), column, limit=limit)
+
 # Main app
 def main():
     st.title("📊 Google Sheet Data Viewer")
@@ -90,6 +90,7 @@ def main():
     # Input for Google Sheet URL
     sheet_url = st.text_input(
         "Enter your public Google Sheet URL",
+        help="A CSV, Excel or Parquet file in the snapshot folder (FOOD_SNAPSHOT_DIR) works too",
         placeholder="https://docs.google.com/spreadsheets/d/your_sheet_id/edit#gid=0"
     )
     
@@ -101,7 +102,8 @@ def main():
         return
     
     # Load the data
-    data = load_data(sheet_url, skip_first_row)
+    with metrics.span("load_data"):
+        data = load_data(sheet_url, skip_first_row)
     
     if data is None or data.empty:
         st.warning("No data found or unable to access the sheet.")
@@ -115,7 +117,7 @@ def main():
     st.subheader("Filter Data")
     
     # Add explanation for multi-column filtering
-    st.markdown('<div class="highlight-text">💡 You can filter multiple columns simultaneously - just select values from any number of columns!</div>', unsafe_allow_html=True)
+    st.markdown('<div class="highlight-text">💡 You can filter multiple columns simultaneously - add any number of columns and select values for each!</div>', unsafe_allow_html=True)
     
     # Filter settings
     col1, col2 = st.columns(2)
@@ -127,129 +129,71 @@ def main():
                                       help="If unchecked, only columns with <= 20 unique values will have filters")
     
     # Phân loại các cột dựa trên số lượng giá trị duy nhất
-    columns_with_few_values = []  # <= 20 giá trị duy nhất
-    columns_with_many_values = []  # > 20 nhưng <= max_unique
-    columns_with_too_many_values = []  # > max_unique
-    
-    for column in data.columns:
-        unique_count = data[column].nunique()
-        if unique_count <= 20:
-            columns_with_few_values.append((column, unique_count))
-        elif unique_count <= max_unique:
-            columns_with_many_values.append((column, unique_count))
-        else:
-            columns_with_too_many_values.append((column, unique_count))
+    column_groups = column_profile(sheet_url, skip_first_row, max_unique)
+    groups = {column: (group, count) for group in ("few", "many", "too_many") for column, count in column_groups[group]}
+    offered = [column for column in data.columns
+               if column in groups and (filter_all_columns or groups[column][0] == "few")]
     
     # Create a container for filters
     filter_container = st.container()
     
-    with filter_container:
+    with filter_container, metrics.span("filter_widgets"):
         st.markdown('<div class="filter-section">', unsafe_allow_html=True)
-        st.markdown('<p class="filter-title">Select filter values for each column:</p>', unsafe_allow_html=True)
+        
+        # Chỉ tạo filter cho các cột người dùng chọn
+        chosen_columns = st.multiselect(
+            "Add filter",
+            options=offered,
+            key="filter_columns",
+            placeholder="Choose columns to filter by"
+        )
         
         # Tạo filters
         filters = {}
         filter_count = 0
         
-        # Hiển thị các cột có ít giá trị duy nhất
-        if columns_with_few_values:
-            st.subheader("Columns with few unique values")
+        # Tạo 3 cột cho mỗi hàng filter
+        cols_per_row = 3
+        for i in range(0, len(chosen_columns), cols_per_row):
+            # Tạo các cột trong một hàng
+            cols = st.columns(cols_per_row)
+            # Lấy một batch các cột để hiển thị trong hàng này
+            batch = chosen_columns[i:i+cols_per_row]
             
-            # Tạo 3 cột cho mỗi hàng filter
-            cols_per_row = 3
-            for i in range(0, len(columns_with_few_values), cols_per_row):
-                # Tạo các cột trong một hàng
-                cols = st.columns(cols_per_row)
-                # Lấy một batch các cột để hiển thị trong hàng này
-                batch = columns_with_few_values[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    with cols[j]:
-                        with st.container():
-                            st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                            
-                            # Tạo multiselect cho filter
-                            unique_values = sorted(data[column].dropna().unique())
-                            selected_values = st.multiselect(
-                                "Select values",
-                                options=unique_values,
-                                default=[],
-                                key=f"few_{column}"
-                            )
-                            
-                            if selected_values:
-                                filters[column] = selected_values
-                                filter_count += 1
-        
-        # Hiển thị các cột có nhiều giá trị duy nhất
-        if columns_with_many_values and filter_all_columns:
-            st.subheader("Columns with many unique values")
-            
-            cols_per_row = 3
-            for i in range(0, len(columns_with_many_values), cols_per_row):
-                cols = st.columns(cols_per_row)
-                batch = columns_with_many_values[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    with cols[j]:
-                        with st.container():
-                            st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
+            for j, column in enumerate(batch):
+                group, count = groups[column]
+                with cols[j]:
+                    with st.container():
+                        st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
+                        limit = None
+                        if group == "many":
                             st.markdown(f'<div class="filter-status warning-text">⚠️ Column has {count} unique values</div>', unsafe_allow_html=True)
-                            
-                            # Tạo multiselect cho filter
-                            unique_values = sorted(data[column].dropna().unique())
-                            selected_values = st.multiselect(
-                                "Select values",
-                                options=unique_values,
-                                default=[],
-                                key=f"many_{column}"
-                            )
-                            
-                            if selected_values:
-                                filters[column] = selected_values
-                                filter_count += 1
-        
-        # Hiển thị các cột có quá nhiều giá trị duy nhất
-        if columns_with_too_many_values and filter_all_columns:
-            st.subheader("Columns with too many unique values")
-            
-            cols_per_row = 3
-            for i in range(0, len(columns_with_too_many_values), cols_per_row):
-                cols = st.columns(cols_per_row)
-                batch = columns_with_too_many_values[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    if j < len(cols):  # Đảm bảo không vượt quá số lượng cột đã tạo
-                        with cols[j]:
-                            with st.container():
-                                st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                                st.markdown(f'<div class="filter-status error-text">🚫 Too many values ({count})</div>', unsafe_allow_html=True)
-                                
-                                if count <= 1000:  # Giới hạn cao hơn cho UI
-                                    st.markdown(f'<div class="filter-status info-text">ℹ️ Showing only first {max_unique} values</div>', unsafe_allow_html=True)
-                                    
-                                    # Tạo multiselect với số lượng giá trị bị giới hạn
-                                    unique_values = sorted(data[column].dropna().unique())[:max_unique]
-                                    selected_values = st.multiselect(
-                                        "Select values",
-                                        options=unique_values,
-                                        default=[],
-                                        key=f"toomany_{column}"
-                                    )
-                                    
-                                    if selected_values:
-                                        filters[column] = selected_values
-                                        filter_count += 1
-                                else:
-                                    st.markdown(f'<div class="filter-status error-text">Cannot display filter for this column</div>', unsafe_allow_html=True)
+                        elif group == "too_many":
+                            st.markdown(f'<div class="filter-status error-text">🚫 Too many values ({count})</div>', unsafe_allow_html=True)
+                            if count > 1000:  # Giới hạn cao hơn cho UI
+                                st.markdown(f'<div class="filter-status error-text">Cannot display filter for this column</div>', unsafe_allow_html=True)
+                                continue
+                            st.markdown(f'<div class="filter-status info-text">ℹ️ Showing only first {max_unique} values</div>', unsafe_allow_html=True)
+                            limit = max_unique
+                        
+                        # Tạo multiselect cho filter
+                        unique_values = column_options(sheet_url, skip_first_row, column, limit)
+                        selected_values = st.multiselect(
+                            "Select values",
+                            options=unique_values,
+                            default=[],
+                            key=f"{group.replace('_', '')}_{column}"
+                        )
+                        
+                        if selected_values:
+                            filters[column] = selected_values
+                            filter_count += 1
         
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Apply filters to the data
-    filtered_data = data.copy()
-    for column, values in filters.items():
-        if values:
-            filtered_data = filtered_data[filtered_data[column].isin(values)]
+    with metrics.span("filter"):
+        filtered_data = engine.apply_filters(data, filters)
     
     # Show filtered data info
     st.subheader("Filtered Data")
@@ -269,19 +213,27 @@ def main():
     # Random selection button
     if st.button("Select 10 Random Rows"):
         if filtered_data.shape[0] > 0:
-            if filtered_data.shape[0] <= 10:
-                st.success(f"All {filtered_data.shape[0]} rows selected as there are fewer than 10 rows after filtering")
-                st.dataframe(filtered_data)
-            else:
-                random_indices = random.sample(range(filtered_data.shape[0]), 10)
-                random_selection = filtered_data.iloc[random_indices]
-                st.success("Randomly selected 10 rows from filtered data")
-                st.dataframe(random_selection)
+            with metrics.span("random_pick") as span:
+                if filtered_data.shape[0] <= 10:
+                    st.success(f"All {filtered_data.shape[0]} rows selected as there are fewer than 10 rows after filtering")
+                    st.dataframe(filtered_data)
+                    span.add_payload(filtered_data)
+                else:
+                    random_selection = engine.sample_rows(filtered_data, 10)
+                    st.success("Randomly selected 10 rows from filtered data")
+                    st.dataframe(random_selection)
+                    span.add_payload(random_selection)
         else:
             st.warning("No data to select after applying filters")
     else:
         # Display the filtered data
-        st.dataframe(filtered_data)
+        with metrics.span("render_table") as span:
+            st.dataframe(filtered_data)
+            span.add_payload(filtered_data)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Time every phase of this rerun (see the performance panel in the sidebar)
+    perf = perf_panel.session_recorder()
+    with metrics.span("rerun"):
+        main()
+    perf_panel.render_debug_panel(perf) 
\ No newline at end of file
@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import random
-import base64
-from io import BytesIO
+import datetime
+from collections import deque
+
+import datasets
+import engine
+import memory
+import metrics
+import perf_panel
+import sampling
+import service
+import settings
+import warmup
 
 # Set page config
 st.set_page_config(
@@ -13,6 +21,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Time every phase of this rerun (see the performance panel in the sidebar)
+perf = perf_panel.session_recorder()
+rerun_span = metrics.span("rerun").start()
+
+# Serve random picks over HTTP from the same datasets when FOOD_SERVICE_PORT is set
+service.start_server()
+
+# Preload FOOD_WARMUP_SHEETS in the background (already running when started via serve.py)
+warmup.start()
+
 # Custom CSS for better UI
 st.markdown("""
 <style>
@@ -135,44 +153,31 @@ st.markdown("""
 
 # Function to download DataFrame as CSV
 def download_csv(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
+    b64 = engine.export_base64(df)
     href = f'<a href="data:file/csv;base64,{b64}" download="filtered_data.csv">Download CSV File</a>'
     return href
 
 # Function to download DataFrame as Excel
 def download_excel(df):
-    output = BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-    df.to_excel(writer, index=False, sheet_name='Sheet1')
-    writer.save()
-    processed_data = output.getvalue()
-    b64 = base64.b64encode(processed_data).decode()
+    b64 = engine.export_base64(df, excel=True)
     href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="filtered_data.xlsx">Download Excel File</a>'
     return href
 
-# Function to get data from Google Sheet
-@st.cache_data(ttl=600)  # Cache data for 10 minutes
-def load_data(sheet_url, skip_first_row=True):
+# Function to get data from Google Sheet, a local file or an uploaded file
+# The dataset store keeps one shared snapshot per sheet for 10 minutes
+def load_data(sheet_url, skip_first_row=True, upload=None):
     try:
-        # Get sheet ID from URL
-        if "spreadsheets/d/" in sheet_url:
-            sheet_id = sheet_url.split("spreadsheets/d/")[1].split("/")[0]
-        else:
-            st.error("Invalid Google Sheet URL")
-            return None
-        
-        # For public sheets, we can use the export CSV link directly
-        csv_export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        
-        if skip_first_row:
-            # Skip the first row (row 1) and use the second row (row 2) as header
-            df = pd.read_csv(csv_export_url, skiprows=1)
-        else:
-            # Use the first row as header (default behavior)
-            df = pd.read_csv(csv_export_url)
-            
-        return df
+        # Uploads are kept in the store like sheets, one per upload, until
+        # the session replaces or clears its upload or goes idle
+        current = (datasets.upload_source(upload.file_id, upload.name), skip_first_row) if upload is not None else None
+        previous = st.session_state.get("upload_source")
+        if previous is not None and previous != current:
+            datasets.discard(*previous)
+        st.session_state["upload_source"] = current
+        datasets.evict_idle_uploads()
+        if upload is not None:
+            return datasets.get_dataset(*current, loader=lambda: engine.read_file(upload, upload.name, skip_first_row))
+        return datasets.get_dataset(sheet_url, skip_first_row)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
@@ -187,7 +192,11 @@ with st.sidebar:
     #     "Enter your public Google Sheet URL",
     #     placeholder="https://docs.google.com/spreadsheets/d/your_sheet_id/edit#gid=0"
     # )
-    sheet_url = "https://docs.google.com/spreadsheets/d/18rWwTejbYT2xrmkVSkRR9-2BCHi0pQyIq_0io-A4DYU/edit?gid=622814645#gid=622814645"
+    sheet_url = settings.DEFAULT_SHEET_URL
+
+    # A local CSV, Excel or Parquet file replaces the sheet (works offline)
+    upload = st.file_uploader("Or open a file", type=["csv", "xlsx", "xls", "parquet"],
+                              help="Use a CSV, Excel or Parquet snapshot instead of the Google Sheet")
     
     # Option to skip first row
     skip_first_row = st.checkbox("Start from row 2 (skip first row)", value=True, help="Select this if you want to ignore the first row and use the second row as header")
@@ -284,15 +293,387 @@ with st.sidebar:
     5. Download the filtered data as CSV or Excel
     """)
 
+# The page is split into fragments so a widget change only reruns the part of
+# the page that depends on it: touching a filter reruns the filter panel and
+# the results below it, a random pick only reruns the pick section, and the
+# CSS, sidebar and statistics are left alone.
+
+@st.fragment
+def stats_panel(dataset):
+    perf_panel.session_recorder()
+    stats_span = metrics.span("stats").start()
+    st.markdown(f'<h2 class="section-header">Data Statistics</h2>', unsafe_allow_html=True)
+    
+    # Create two columns
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Count of non-null values for each column
+        st.subheader("Non-null values count")
+        non_null_counts, mean_values = dataset.column_stats()
+        st.bar_chart(non_null_counts)
+    
+    with col2:
+        # For numeric columns, show mean values
+        if mean_values is not None:
+            st.subheader("Mean values for numeric columns")
+            st.bar_chart(mean_values)
+    stats_span.stop()
+
+# Rows picked recently in this session, so "pick again" doesn't repeat them
+def pick_history(dataset, size):
+    history = st.session_state.get("pick_history")
+    if history is None or history["version"] != dataset.version or history["recent"].maxlen != size:
+        # Row positions only mean something within one version of the data
+        kept = history["recent"] if history is not None and history["version"] == dataset.version else []
+        history = {"version": dataset.version, "recent": deque(kept, maxlen=size)}
+        st.session_state["pick_history"] = history
+    return history["recent"]
+
+# Columns shown in the results tables. The choice is kept in session state
+# outside the widget too, as Streamlit drops widget state on runs that don't
+# draw it (e.g. while a sheet fails to load).
+def display_columns(data):
+    columns = list(data.columns)
+    saved = st.session_state.get("shown_columns", columns[:settings.DISPLAY_COLUMNS])
+    current = st.session_state.get("display_columns", saved)
+    st.session_state["display_columns"] = [column for column in current if column in columns]
+    chosen = st.multiselect(
+        "Columns to show",
+        options=columns,
+        key="display_columns",
+        help="Only these columns are sent to the tables below; downloads always include every column"
+    )
+    st.session_state["shown_columns"] = chosen
+    if len(columns) > len(chosen):
+        st.caption(f"Showing {len(chosen)} of {len(columns)} columns")
+    return [column for column in columns if column in chosen] or columns[:settings.DISPLAY_COLUMNS]
+
+@st.fragment
+def random_pick_panel(dataset, filters, filtered_data, random_count, pick_settings, columns):
+    perf_panel.session_recorder()
+    # Random selection button
+    if st.button(f"Select {random_count} Random Rows"):
+        if filtered_data.shape[0] > 0:
+            with metrics.span("random_pick") as span:
+                if filtered_data.shape[0] <= random_count:
+                    st.markdown(f'<div class="success-box">All {filtered_data.shape[0]} rows selected as there are fewer than {random_count} rows after filtering</div>', unsafe_allow_html=True)
+                    table = dataset.display_table(dataset.filter_positions(filters), columns, settings.DISPLAY_MAX_CHARS,
+                                                  engine.filter_signature(filters))
+                    st.dataframe(table, height=400)
+                    span.add_payload(table)
+                else:
+                    weight_column, prefer, history_size = pick_settings
+                    table = dataset.alias_table(filters, weight_column, prefer) if weight_column else None
+                    recent = pick_history(dataset, history_size)
+                    picked = sampling.pick_positions(dataset.filter_positions(filters), random_count, table=table, recent=recent)
+                    recent.extend(picked.tolist())
+                    random_selection = dataset.display_table(picked, columns, settings.DISPLAY_MAX_CHARS)
+                    how = f"weighted by {weight_column}" if weight_column else "randomly"
+                    st.markdown(f'<div class="success-box">Selected {random_count} rows {how} from filtered data</div>', unsafe_allow_html=True)
+                    st.dataframe(random_selection, height=400)
+                    span.add_payload(random_selection)
+        else:
+            st.warning("No data to select after applying filters")
+
+@st.fragment
+def simulation_panel(dataset, filters, pick_settings):
+    perf_panel.session_recorder()
+    weight_column, prefer, _ = pick_settings
+    with st.expander("Fairness check (simulate draws)"):
+        how = f"weighted by {weight_column} ({prefer} preferred)" if weight_column else "uniformly"
+        st.caption(f"Simulates single-row picks {how} over the filtered rows from the table the pick button draws from, "
+                   "and compares how often each row and category comes up with what the weights call for. "
+                   "The no-repeat history is not applied.")
+        col1, col2 = st.columns(2)
+        with col1:
+            draws = st.number_input("Number of draws", min_value=1000, max_value=500_000, value=100_000, step=10_000)
+        with col2:
+            category_options = ["(none)"] + dataset.frame.select_dtypes(exclude="number").columns.tolist()
+            category_column = st.selectbox("Group by category", category_options)
+        if not st.button("Run simulation"):
+            return
+        positions = dataset.filter_positions(filters)
+        if len(positions) == 0:
+            st.warning("No data to select after applying filters")
+            return
+        with metrics.span("simulate"):
+            table = dataset.alias_table(filters, weight_column, prefer) if weight_column else None
+            # Expected counts come from the weights themselves, not the table
+            weights = dataset.pick_weights(positions, weight_column, prefer) if weight_column else None
+            observed, expected = sampling.simulate_draws(len(positions), int(draws), table, weights)
+            statistic, dof, p_value = sampling.chi_square(observed, expected)
+        
+        st.markdown(f'<div class="info-box">Per row: χ² = {statistic:,.1f} with {dof:,} degrees of freedom, p = {p_value:.3f}. '
+                    f'{"No evidence of bias" if p_value >= 0.01 else "Frequencies differ from the expected ones"} at the 1% level.</div>',
+                    unsafe_allow_html=True)
+        if expected.min() < 5:
+            st.caption("Some rows expect fewer than 5 picks; run more draws for a reliable per-row test.")
+        
+        rows = dataset.frame.iloc[positions].reset_index(drop=True)
+        per_row = pd.DataFrame({"observed": observed, "expected": expected})
+        per_row["ratio"] = per_row["observed"] / per_row["expected"]
+        label = rows.columns[0]
+        per_row.index = rows[label].astype(str) + " #" + per_row.index.astype(str)
+        st.subheader("Per-row frequencies")
+        st.bar_chart(per_row.nlargest(50, "expected")[["observed", "expected"]])
+        st.dataframe(per_row.sort_values("ratio"), height=300)
+        
+        if category_column != "(none)":
+            per_category = sampling.category_frequencies(rows[category_column], observed, expected)
+            statistic, dof, p_value = sampling.chi_square(per_category["observed"], per_category["expected"])
+            st.subheader(f"Per {category_column}")
+            st.markdown(f"χ² = {statistic:,.1f} with {dof} degrees of freedom, p = {p_value:.3f}")
+            st.bar_chart(per_category[["observed", "expected"]])
+            st.dataframe(per_category)
+
+@st.fragment
+def results_panel(dataset, filters, filtered_data, active_filters, random_count, pick_settings):
+    perf_panel.session_recorder()
+    # Show filtered data info
+    st.markdown(f'<h2 class="section-header">Filtered Data</h2>', unsafe_allow_html=True)
+    
+    # Display active filters
+    if active_filters:
+        st.markdown(f'<div class="active-filters">', unsafe_allow_html=True)
+        st.markdown(f"<b>Active Filters ({len(active_filters)}):</b>", unsafe_allow_html=True)
+        badges_html = ""
+        for filter_item in active_filters:
+            badges_html += f'<span class="filter-badge">{filter_item}</span>'
+        st.markdown(badges_html, unsafe_allow_html=True)
+        st.markdown(f'<p>Showing {filtered_data.shape[0]} rows after applying {len(active_filters)} filter(s)</p>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+        st.caption("The page address now holds these filters; share it to open the same view.")
+    else:
+        st.markdown(f'<div class="info-box">Showing all {filtered_data.shape[0]} rows (no filters applied)</div>', unsafe_allow_html=True)
+    
+    columns = display_columns(filtered_data)
+    
+    # Buttons for actions
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        random_pick_panel(dataset, filters, filtered_data, random_count, pick_settings, columns)
+    
+    with col2:
+        # Download as CSV
+        if st.button("Download as CSV"):
+            with metrics.span("export") as span:
+                href = download_csv(filtered_data)
+                st.markdown(href, unsafe_allow_html=True)
+                span.add_bytes(len(href))
+                memory.record_export(len(href))
+    
+    with col3:
+        # Download as Excel
+        if st.button("Download as Excel"):
+            with metrics.span("export") as span:
+                href = download_excel(filtered_data)
+                st.markdown(href, unsafe_allow_html=True)
+                span.add_bytes(len(href))
+                memory.record_export(len(href))
+    
+    # Display the filtered data
+    with metrics.span("render_table") as span:
+        table = dataset.display_table(dataset.filter_positions(filters), columns, settings.DISPLAY_MAX_CHARS,
+                                      engine.filter_signature(filters))
+        st.dataframe(table, height=500)
+        span.add_payload(table)
+    
+    simulation_panel(dataset, filters, pick_settings)
+
+# Widget for one filter column; returns the selected values / range, or None
+# Range slider for a date column; days unless the column has times of day
+def date_filter_widget(dataset, column, restored=None):
+    min_val, max_val = engine.numeric_range(dataset.frame, column)
+    if min_val == max_val:
+        st.markdown(f'<div class="filter-status error-text">🚫 No range to filter</div>', unsafe_allow_html=True)
+        return None
+    values = dataset.frame[column]
+    if (values.dropna() == values.dropna().dt.normalize()).all():
+        low, high = min_val.date(), max_val.date()
+        step = datetime.timedelta(days=1)
+        convert = lambda bound: bound.date()
+    else:
+        low, high = min_val.to_pydatetime(), max_val.to_pydatetime()
+        step = datetime.timedelta(minutes=1)
+        convert = lambda bound: bound.floor("min").to_pydatetime()
+    key = f"numeric_{column}"
+    if restored is not None:
+        st.session_state[key] = restore_range(restored, low, high, convert)
+    selected = st.slider("Range", min_value=low, max_value=high, value=None if restored is not None else (low, high),
+                         step=step, key=key)
+    if selected == (low, high):
+        return None
+    start, end = pd.Timestamp(selected[0]), pd.Timestamp(selected[1])
+    if step.days:
+        # The whole last day is in range
+        end += pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return (start, end)
+
+# A range from a shared link as slider values, kept inside the slider's bounds
+def restore_range(restored, low, high, convert=float):
+    bounds = []
+    for bound, default in zip(restored, (low, high)):
+        try:
+            bounds.append(min(max(convert(bound), low), high))
+        except (TypeError, ValueError, AttributeError):
+            # e.g. a number for what is now a date column
+            bounds.append(default)
+    return tuple(bounds) if bounds[0] <= bounds[1] else (low, high)
+
+# `restored` is the filter from a shared link, set as the widget's state
+def filter_widget(dataset, column, group, count, max_unique_values, restored=None):
+    st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
+    
+    if group == "numeric" and pd.api.types.is_datetime64_any_dtype(dataset.frame[column].dtype):
+        return date_filter_widget(dataset, column, restored if isinstance(restored, tuple) else None)
+
+    if group == "numeric":
+        min_val, max_val = engine.numeric_range(dataset.frame, column)
+        # Bỏ qua nếu khoảng quá nhỏ
+        if max_val - min_val < 1e-9:
+            st.markdown(f'<div class="filter-status error-text">🚫 No range to filter</div>', unsafe_allow_html=True)
+            return None
+        if isinstance(restored, tuple):
+            st.session_state[f"numeric_{column}"] = restore_range(restored, min_val, max_val)
+        values = st.slider(
+            f"Range",
+            min_value=min_val,
+            max_value=max_val,
+            value=None if isinstance(restored, tuple) else (min_val, max_val),
+            key=f"numeric_{column}"
+        )
+        return values if values != (min_val, max_val) else None
+    
+    if group == "too_many":
+        st.markdown(f'<div class="filter-status error-text">🚫 {count} values (too many)</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="filter-status info-text">ℹ️ Showing only first {max_unique_values} values</div>', unsafe_allow_html=True)
+        try:
+            unique_values = dataset.filter_options(column, limit=max_unique_values, as_text=True)
+        except Exception:
+            st.markdown(f'<div class="filter-status error-text">Cannot create filter</div>', unsafe_allow_html=True)
+            return None
+    else:
+        if group == "many":
+            st.markdown(f'<div class="filter-status warning-text">⚠️ {count} unique values</div>', unsafe_allow_html=True)
+        unique_values = dataset.filter_options(column)
+    
+    key = f"{group.replace('_', '')}_{column}"
+    if isinstance(restored, list):
+        # Values the sheet no longer has are dropped
+        allowed = set(unique_values)
+        st.session_state[key] = [value for value in restored if value in allowed]
+    selected_values = st.multiselect(
+        f"Select values",
+        options=unique_values,
+        default=None if isinstance(restored, list) else [],
+        key=key
+    )
+    return selected_values or None
+
+# Filters from a shared link (?filters=<token>), read when the session starts
+# or the link changes; returns {column: filter} for the widgets to start from
+def shared_filters(offered):
+    token = st.query_params.get("filters", "")
+    if token == st.session_state.get("filter_token", ""):
+        return {}
+    st.session_state["filter_token"] = token
+    try:
+        filters = engine.parse_filter_token(token)
+    except ValueError:
+        st.warning("The filters in this link could not be read; showing all rows.")
+        return {}
+    restored = {column: value for column, value in filters.items() if column in offered}
+    skipped = [str(column) for column in filters if column not in restored]
+    if skipped:
+        st.warning(f"Filters in this link that don't apply to this sheet were skipped: {', '.join(skipped)}")
+    st.session_state["filter_columns"] = list(restored)
+    return restored
+
+# Keep the page address in step with the filters, so it can be shared
+def share_filters(filters):
+    token = engine.filter_token(filters)
+    if token == st.session_state.get("filter_token", ""):
+        return
+    st.session_state["filter_token"] = token
+    if token:
+        st.query_params["filters"] = token
+    elif "filters" in st.query_params:
+        del st.query_params["filters"]
+
+@st.fragment
+def filter_panel(dataset, max_unique_values, filter_all_columns, random_count, pick_settings):
+    perf_panel.session_recorder()
+    data = dataset.frame
+    
+    # Create filters
+    st.markdown(f'<h2 class="section-header">Filter Data</h2>', unsafe_allow_html=True)
+    
+    # Explanation for filtering multiple columns
+    st.markdown('<div class="filter-box"><h3>💡 Multi-Column Filtering</h3><p>You can filter multiple columns simultaneously! Add any number of columns below and pick values for each. All filters will be applied together to find rows that match <b>ALL</b> selected criteria.</p></div>', unsafe_allow_html=True)
+    
+    # Phân loại các cột theo loại dữ liệu và số lượng giá trị duy nhất
+    with metrics.span("classify"):
+        column_groups = dataset.profile(max_unique_values)
+    
+    # Only columns the user adds get a widget, so the page (and the option
+    # lists sent to the browser) grows with the filters in use, not the sheet
+    groups = {column: (group, count) for group in ("few", "many", "numeric", "too_many") for column, count in column_groups[group]}
+    offered = [column for column in data.columns
+               if column in groups and (filter_all_columns or groups[column][0] in ("few", "numeric"))]
+    
+    # Tạo filters
+    filters = {}
+    widgets_span = metrics.span("filter_widgets").start()
+    restored = shared_filters(offered)
+    
+    # Container cho các filter
+    st.markdown('<div class="filter-section">', unsafe_allow_html=True)
+    chosen_columns = st.multiselect(
+        "Add filter",
+        options=offered,
+        key="filter_columns",
+        placeholder="Choose columns to filter by",
+        help="Pick the columns you want to filter; a filter appears below for each one"
+    )
+    
+    # Tạo lưới cho các filter đã chọn
+    cols_per_row = 3
+    for i in range(0, len(chosen_columns), cols_per_row):
+        cols = st.columns(cols_per_row)
+        batch = chosen_columns[i:i+cols_per_row]
+        
+        for j, column in enumerate(batch):
+            with cols[j]:
+                with st.container():
+                    group, count = groups[column]
+                    value = filter_widget(dataset, column, group, count, max_unique_values, restored.get(column))
+                    if value is not None:
+                        filters[column] = value
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    widgets_span.stop()
+    
+    # Apply filters to the data; a shared link's rows usually come straight
+    # from the result cache, keyed by the dataset version and the filters
+    with metrics.span("filter"):
+        filtered_data = dataset.filter(filters)
+    active_filters = engine.describe_filters(filters)
+    share_filters(filters)
+    
+    results_panel(dataset, filters, filtered_data, active_filters, random_count, pick_settings)
+
 # Main content
 st.markdown('<h1 class="main-header">📊 Google Sheet Data Viewer</h1>', unsafe_allow_html=True)
 
-if not sheet_url:
+if not sheet_url and upload is None:
     st.markdown('<div class="info-box">Please enter a public Google Sheet URL in the sidebar to get started.</div>', unsafe_allow_html=True)
 else:
     # Load the data
-    with st.spinner("Loading data from Google Sheet..."):
-        data = load_data(sheet_url, skip_first_row)
+    with st.spinner("Loading data from Google Sheet..."), metrics.span("load_data"):
+        dataset = load_data(sheet_url, skip_first_row, upload)
+        data = dataset.frame if dataset is not None else None
     
     if data is None or data.empty:
         st.warning("No data found or unable to access the sheet.")
@@ -302,241 +683,33 @@ else:
         first_row_info = "Starting from row 2 (skipping first row)" if skip_first_row else "Starting from row 1"
         st.markdown(f'<div class="info-box">Loaded {data.shape[0]} rows and {data.shape[1]} columns. {first_row_info}.</div>', unsafe_allow_html=True)
         
-        # Show basic statistics if enabled
-        if show_stats:
-            st.markdown(f'<h2 class="section-header">Data Statistics</h2>', unsafe_allow_html=True)
-            
-            # Create two columns
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Count of non-null values for each column
-                st.subheader("Non-null values count")
-                non_null_counts = data.count()
-                st.bar_chart(non_null_counts)
-            
-            with col2:
-                # For numeric columns, show mean values
-                numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-                if numeric_cols:
-                    st.subheader("Mean values for numeric columns")
-                    mean_values = data[numeric_cols].mean()
-                    st.bar_chart(mean_values)
-        
-        # Create filters
-        st.markdown(f'<h2 class="section-header">Filter Data</h2>', unsafe_allow_html=True)
-        
-        # Explanation for filtering multiple columns
-        st.markdown('<div class="filter-box"><h3>💡 Multi-Column Filtering</h3><p>You can filter multiple columns simultaneously! Select filter values for any number of columns below. All filters will be applied together to find rows that match <b>ALL</b> selected criteria.</p></div>', unsafe_allow_html=True)
+        # Text columns converted to numbers or dates when the sheet was loaded,
+        # and those kept as text because a few cells don't parse
+        converted = [entry for entry in dataset.coercions if entry["kind"] != "text"]
+        held_back = [entry for entry in dataset.coercions if entry["unparsed"]]
+        if converted or held_back:
+            kept = f", kept {len(held_back)} as text (see unparsed)" if held_back else ""
+            with st.expander(f"Converted {len(converted)} text column(s) to numbers or dates{kept}"):
+                st.dataframe(pd.DataFrame(dataset.coercions).set_index("column"))
         
-        # Phân loại các cột theo loại dữ liệu và số lượng giá trị duy nhất
-        columns_with_few_values = []  # <= 20 giá trị duy nhất
-        columns_with_many_values = []  # > 20 nhưng <= max_unique_values
-        columns_with_too_many_values = []  # > max_unique_values
-        numeric_columns = []
+        # Weighting and no-repeat settings for random picks
+        with st.sidebar:
+            st.subheader("Random Pick Settings")
+            numeric_columns = data.select_dtypes(include="number").columns.tolist()
+            weight_column = st.selectbox("Weight picks by", ["(none)"] + numeric_columns,
+                                         help="Rows with a better value in this column are picked more often")
+            prefer = "higher"
+            if weight_column != "(none)":
+                prefer = "lower" if st.radio("Prefer", ["Higher values", "Lower values"], horizontal=True) == "Lower values" else "higher"
+            history_size = st.slider("Don't repeat the last N picks", 0, 200, 0,
+                                     help="Recently picked rows are skipped while enough other rows match")
+        pick_settings = (None if weight_column == "(none)" else weight_column, prefer, history_size)
         
-        for column in data.columns:
-            dtype = data[column].dtype
-            unique_count = data[column].nunique()
-            
-            if pd.api.types.is_numeric_dtype(dtype) and unique_count > 1:
-                numeric_columns.append((column, unique_count))
-            elif unique_count <= 20:
-                columns_with_few_values.append((column, unique_count))
-            elif unique_count <= max_unique_values:
-                columns_with_many_values.append((column, unique_count))
-            else:
-                columns_with_too_many_values.append((column, unique_count))
-        
-        # Tạo filters
-        filters = {}
-        
-        # Container cho các filter
-        st.markdown('<div class="filter-section">', unsafe_allow_html=True)
-        st.markdown('<div class="filter-title">Select filter values for columns:</div>', unsafe_allow_html=True)
-        
-        # Hiển thị các cột với ít giá trị trước
-        if columns_with_few_values:
-            st.subheader("Columns with few unique values")
-            
-            # Tạo lưới cho các filter này
-            cols_per_row = 3
-            for i in range(0, len(columns_with_few_values), cols_per_row):
-                cols = st.columns(cols_per_row)
-                batch = columns_with_few_values[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    with cols[j]:
-                        with st.container():
-                            st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                            
-                            unique_values = sorted(data[column].dropna().unique())
-                            selected_values = st.multiselect(
-                                f"Select values",
-                                options=unique_values,
-                                default=[],
-                                key=f"few_{column}"
-                            )
-                            
-                            if selected_values:
-                                filters[column] = selected_values
-        
-        # Hiển thị các cột với nhiều giá trị
-        if columns_with_many_values and filter_all_columns:
-            st.subheader("Columns with many unique values")
-            
-            # Tạo lưới cho các filter này
-            cols_per_row = 3
-            for i in range(0, len(columns_with_many_values), cols_per_row):
-                cols = st.columns(cols_per_row)
-                batch = columns_with_many_values[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    with cols[j]:
-                        with st.container():
-                            st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                            st.markdown(f'<div class="filter-status warning-text">⚠️ {count} unique values</div>', unsafe_allow_html=True)
-                            
-                            unique_values = sorted(data[column].dropna().unique())
-                            selected_values = st.multiselect(
-                                f"Select values",
-                                options=unique_values,
-                                default=[],
-                                key=f"many_{column}"
-                            )
-                            
-                            if selected_values:
-                                filters[column] = selected_values
-        
-        # Hiển thị các cột số
-        if numeric_columns:
-            st.subheader("Numeric columns")
-            
-            # Tạo lưới cho các filter này
-            cols_per_row = 3
-            for i in range(0, len(numeric_columns), cols_per_row):
-                cols = st.columns(cols_per_row)
-                batch = numeric_columns[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    if j < len(cols):
-                        with cols[j]:
-                            with st.container():
-                                min_val = float(data[column].min())
-                                max_val = float(data[column].max())
-                                
-                                # Bỏ qua nếu khoảng quá nhỏ
-                                if max_val - min_val < 1e-9:
-                                    st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                                    st.markdown(f'<div class="filter-status error-text">🚫 No range to filter</div>', unsafe_allow_html=True)
-                                    continue
-                                
-                                st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                                
-                                values = st.slider(
-                                    f"Range",
-                                    min_value=min_val,
-                                    max_value=max_val,
-                                    value=(min_val, max_val),
-                                    key=f"numeric_{column}"
-                                )
-                                
-                                if values != (min_val, max_val):
-                                    filters[f"{column}_range"] = values
-        
-        # Hiển thị các cột với quá nhiều giá trị
-        if columns_with_too_many_values and filter_all_columns:
-            st.subheader("Columns with too many unique values")
-            
-            # Tạo lưới cho các filter này
-            cols_per_row = 3
-            for i in range(0, len(columns_with_too_many_values), cols_per_row):
-                cols = st.columns(cols_per_row)
-                batch = columns_with_too_many_values[i:i+cols_per_row]
-                
-                for j, (column, count) in enumerate(batch):
-                    if j < len(cols):
-                        with cols[j]:
-                            with st.container():
-                                st.markdown(f'<div class="filter-header">Filter by {column}</div>', unsafe_allow_html=True)
-                                st.markdown(f'<div class="filter-status error-text">🚫 {count} values (too many)</div>', unsafe_allow_html=True)
-                                st.markdown(f'<div class="filter-status info-text">ℹ️ Showing only first {max_unique_values} values</div>', unsafe_allow_html=True)
-                                
-                                try:
-                                    unique_values = sorted(data[column].astype(str).dropna().unique())[:max_unique_values]
-                                    selected_values = st.multiselect(
-                                        f"Select values",
-                                        options=unique_values,
-                                        default=[],
-                                        key=f"toomany_{column}"
-                                    )
-                                    
-                                    if selected_values:
-                                        filters[column] = selected_values
-                                except:
-                                    st.markdown(f'<div class="filter-status error-text">Cannot create filter</div>', unsafe_allow_html=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Apply filters to the data
-        filtered_data = data.copy()
-        active_filters = []
-        
-        for column, values in filters.items():
-            if column.endswith("_range"):
-                # Handle range filters
-                col_name = column.replace("_range", "")
-                min_val, max_val = values
-                filtered_data = filtered_data[(filtered_data[col_name] >= min_val) & (filtered_data[col_name] <= max_val)]
-                active_filters.append(f"{col_name}: {min_val} to {max_val}")
-            else:
-                # Handle multiselect filters
-                filtered_data = filtered_data[filtered_data[column].isin(values)]
-                active_filters.append(f"{column}: {', '.join(str(v) for v in values)}")
-        
-        # Show filtered data info
-        st.markdown(f'<h2 class="section-header">Filtered Data</h2>', unsafe_allow_html=True)
-        
-        # Display active filters
-        if active_filters:
-            st.markdown(f'<div class="active-filters">', unsafe_allow_html=True)
-            st.markdown(f"<b>Active Filters ({len(active_filters)}):</b>", unsafe_allow_html=True)
-            badges_html = ""
-            for filter_item in active_filters:
-                badges_html += f'<span class="filter-badge">{filter_item}</span>'
-            st.markdown(badges_html, unsafe_allow_html=True)
-            st.markdown(f'<p>Showing {filtered_data.shape[0]} rows after applying {len(active_filters)} filter(s)</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-        else:
-            st.markdown(f'<div class="info-box">Showing all {filtered_data.shape[0]} rows (no filters applied)</div>', unsafe_allow_html=True)
-        
-        # Buttons for actions
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            # Random selection button
-            if st.button(f"Select {random_count} Random Rows"):
-                if filtered_data.shape[0] > 0:
-                    if filtered_data.shape[0] <= random_count:
-                        st.markdown(f'<div class="success-box">All {filtered_data.shape[0]} rows selected as there are fewer than {random_count} rows after filtering</div>', unsafe_allow_html=True)
-                        st.dataframe(filtered_data, height=400)
-                    else:
-                        random_indices = random.sample(range(filtered_data.shape[0]), random_count)
-                        random_selection = filtered_data.iloc[random_indices]
-                        st.markdown(f'<div class="success-box">Randomly selected {random_count} rows from filtered data</div>', unsafe_allow_html=True)
-                        st.dataframe(random_selection, height=400)
-                else:
-                    st.warning("No data to select after applying filters")
-        
-        with col2:
-            # Download as CSV
-            if st.button("Download as CSV"):
-                st.markdown(download_csv(filtered_data), unsafe_allow_html=True)
-        
-        with col3:
-            # Download as Excel
-            if st.button("Download as Excel"):
-                st.markdown(download_excel(filtered_data), unsafe_allow_html=True)
+        # Show basic statistics if enabled
+        if show_stats:
+            stats_panel(dataset)
         
-        # Display the filtered data
-        st.dataframe(filtered_data, height=500)
+        filter_panel(dataset, max_unique_values, filter_all_columns, random_count, pick_settings)
+
+rerun_span.stop()
+perf_panel.render_debug_panel(perf)
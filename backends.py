@@ -0,0 +1,236 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import engine
+import metrics
+import settings
+
+logger = metrics.get_logger(__name__)
+
+# Query backends run the filter set and the statistics for a dataset. pandas
+# (with the dataset's value indexes) is always available; DuckDB and Polars
+# are optional multithreaded columnar engines picked with FOOD_QUERY_BACKEND.
+
+# Prepared copies of recent dataset versions kept by the columnar backends
+MAX_PREPARED_DATASETS = 4
+
+
+class PandasBackend:
+    name = "pandas"
+
+    def filter_positions(self, dataset, filters):
+        return dataset.index_positions(filters)
+
+    def column_stats(self, dataset):
+        return engine.column_stats(dataset.frame)
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        self._connection = duckdb.connect(database=":memory:")
+        if settings.QUERY_THREADS:
+            self._connection.execute(f"SET threads TO {int(settings.QUERY_THREADS)}")
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _cursor(self):
+        # DuckDB connections are not shared between threads; each thread gets
+        # its own cursor on the same in-memory database
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self._connection.cursor()
+        return cursor
+
+    # Copy the snapshot into DuckDB's columnar storage once per dataset version
+    def _table(self, dataset):
+        with self._lock:
+            name = self._tables.get(dataset.version)
+            if name is None:
+                name = f"dataset_{dataset.version}"
+                frame = dataset.frame.copy(deep=False)
+                frame.columns = [str(column) for column in frame.columns]
+                frame["__pos"] = np.arange(len(frame))
+                self._connection.register("incoming_frame", frame)
+                self._connection.execute(f"CREATE TABLE {_quote(name)} AS SELECT * FROM incoming_frame")
+                self._connection.unregister("incoming_frame")
+                self._tables[dataset.version] = name
+                while len(self._tables) > MAX_PREPARED_DATASETS:
+                    _, old = self._tables.popitem(last=False)
+                    self._connection.execute(f"DROP TABLE IF EXISTS {_quote(old)}")
+            else:
+                self._tables.move_to_end(dataset.version)
+            return name
+
+    def filter_positions(self, dataset, filters):
+        table = self._table(dataset)
+        clauses = []
+        params = []
+        for column, values in filters.items():
+            column_sql = _quote(column)
+            if isinstance(values, tuple):
+                # Leave open bounds out: infinity can't be compared with dates
+                bounds = [f"{column_sql} IS NOT NULL"]
+                for operator, bound in zip((">=", "<="), values):
+                    if not engine.is_open_bound(bound):
+                        bounds.append(f"{column_sql} {operator} ?")
+                        params.append(bound)
+                clauses.append(" AND ".join(bounds))
+            elif values:
+                values = [engine.canonical_value(v) for v in values]
+                if all(isinstance(v, str) for v in values) and not pd.api.types.is_string_dtype(dataset.frame[column].dtype):
+                    # Text options offered for a non-text column
+                    column_sql = f"CAST({column_sql} AS VARCHAR)"
+                clauses.append(f"{column_sql} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        where = " AND ".join(clauses) or "TRUE"
+        rows = self._cursor().execute(f"SELECT __pos FROM {_quote(table)} WHERE {where}", params).fetchnumpy()
+        # Sorting here is cheaper than ORDER BY across DuckDB threads
+        return np.sort(np.asarray(rows["__pos"], dtype=np.intp))
+
+    def column_stats(self, dataset):
+        table = self._table(dataset)
+        frame = dataset.frame
+        numeric_cols = frame.select_dtypes(include=[np.number]).columns.tolist()
+        selects = [f"count({_quote(column)})" for column in frame.columns]
+        selects += [f"avg({_quote(column)})" for column in numeric_cols]
+        row = self._cursor().execute(f"SELECT {', '.join(selects)} FROM {_quote(table)}").fetchone()
+        non_null_counts = pd.Series(row[:len(frame.columns)], index=frame.columns, dtype="int64")
+        mean_values = pd.Series(row[len(frame.columns):], index=numeric_cols, dtype="float64") if numeric_cols else None
+        return non_null_counts, mean_values
+
+
+class PolarsBackend:
+    name = "polars"
+
+    def __init__(self):
+        import polars
+
+        self._pl = polars
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _frame(self, dataset):
+        with self._lock:
+            frame = self._frames.get(dataset.version)
+            if frame is None:
+                source = dataset.frame.copy(deep=False)
+                source.columns = [str(column) for column in source.columns]
+                frame = self._pl.from_pandas(source).with_row_index("__pos")
+                self._frames[dataset.version] = frame
+                while len(self._frames) > MAX_PREPARED_DATASETS:
+                    self._frames.popitem(last=False)
+            else:
+                self._frames.move_to_end(dataset.version)
+            return frame
+
+    def filter_positions(self, dataset, filters):
+        pl = self._pl
+        frame = self._frame(dataset)
+        expression = pl.lit(True)
+        for column, values in filters.items():
+            name = str(column)
+            if isinstance(values, tuple):
+                # Open bounds are left out, as in the DuckDB backend
+                expression = expression & pl.col(name).is_not_null()
+                if not engine.is_open_bound(values[0]):
+                    expression = expression & (pl.col(name) >= values[0])
+                if not engine.is_open_bound(values[1]):
+                    expression = expression & (pl.col(name) <= values[1])
+            elif values:
+                values = [engine.canonical_value(v) for v in values]
+                target = pl.col(name)
+                if all(isinstance(v, str) for v in values) and frame.schema[name] != pl.Utf8:
+                    # Text options offered for a non-text column
+                    target = target.cast(pl.Utf8)
+                expression = expression & target.is_in(values)
+        positions = frame.lazy().filter(expression).select("__pos").collect()["__pos"]
+        return positions.to_numpy().astype(np.intp)
+
+    def column_stats(self, dataset):
+        pl = self._pl
+        frame = self._frame(dataset)
+        columns = dataset.frame.columns
+        numeric_cols = dataset.frame.select_dtypes(include=[np.number]).columns.tolist()
+        counts = frame.select([pl.col(str(column)).count().alias(f"c{i}") for i, column in enumerate(columns)]).row(0)
+        non_null_counts = pd.Series(counts, index=columns, dtype="int64")
+        mean_values = None
+        if numeric_cols:
+            means = frame.select([pl.col(str(column)).mean().alias(f"m{i}") for i, column in enumerate(numeric_cols)]).row(0)
+            mean_values = pd.Series(means, index=numeric_cols, dtype="float64")
+        return non_null_counts, mean_values
+
+
+_BACKENDS = {
+    "pandas": PandasBackend,
+    "duckdb": DuckDBBackend,
+    "polars": PolarsBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _create(name):
+    if name == "auto":
+        for candidate in ("duckdb", "polars"):
+            try:
+                return _BACKENDS[candidate]()
+            except ImportError:
+                continue
+        return PandasBackend()
+    if name not in _BACKENDS:
+        logger.warning("Unknown query backend %r, using pandas", name)
+        return PandasBackend()
+    try:
+        return _BACKENDS[name]()
+    except ImportError as e:
+        logger.warning("Query backend %r is not available (%s), using pandas", name, e)
+        return PandasBackend()
+
+
+# The backend selected by FOOD_QUERY_BACKEND, created once per process
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create(settings.QUERY_BACKEND)
+                logger.info("Using %s query backend", _backend.name)
+    return _backend
+
+
+_pandas = PandasBackend()
+
+
+# Run on the configured backend; anything it can't handle (e.g. a mixed-type
+# column DuckDB refuses to load) falls back to pandas
+def filter_positions(dataset, filters):
+    backend = get_backend()
+    if not isinstance(backend, PandasBackend):
+        try:
+            return backend.filter_positions(dataset, filters)
+        except Exception as e:
+            logger.warning("%s backend failed to filter, using pandas: %s", backend.name, e)
+    return _pandas.filter_positions(dataset, filters)
+
+
+def column_stats(dataset):
+    backend = get_backend()
+    if not isinstance(backend, PandasBackend):
+        try:
+            return backend.column_stats(dataset)
+        except Exception as e:
+            logger.warning("%s backend failed to compute statistics, using pandas: %s", backend.name, e)
+    return _pandas.column_stats(dataset)
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Compare query backends on a synthetic sheet:
+#   python benchmarks/bench_backends.py --rows 1000000
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import backends  # noqa: E402
+import datasets  # noqa: E402
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Name": np.char.add("Dish ", rng.integers(0, rows, rows).astype(str)),
+        "Type": rng.choice(["Rice", "Noodles", "Soup", "Bread", "Salad"], rows),
+        "Area": rng.choice([f"District {i}" for i in range(1, 13)], rows),
+        "Vegetarian": rng.choice(["Yes", "No"], rows),
+        "Price": rng.integers(20, 200, rows) * 1000,
+        "Rating": rng.random(rows) * 5,
+    })
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark filtering and statistics per query backend.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backends", default="pandas,duckdb,polars")
+    args = parser.parse_args(argv)
+
+    frame = synthetic_frame(args.rows)
+    filters = {"Type": ["Rice", "Noodles"], "Vegetarian": ["Yes"], "Price": (30000.0, 90000.0)}
+    print(f"{args.rows} rows, filters: {filters}")
+
+    for name in args.backends.split(","):
+        try:
+            backend = backends._BACKENDS[name]()
+        except ImportError as e:
+            print(f"{name:8} not available ({e})")
+            continue
+        dataset = datasets.Dataset(f"synthetic-{name}", False, frame)
+        # Prepare once (indexes / columnar copy), then time the queries
+        start = time.perf_counter()
+        backend.filter_positions(dataset, filters)
+        prepare = time.perf_counter() - start
+        filter_time = best_of(args.repeat, lambda: backend.filter_positions(dataset, filters))
+        stats_time = best_of(args.repeat, lambda: backend.column_stats(dataset))
+        matched = len(backend.filter_positions(dataset, filters))
+        print(f"{name:8} first query {prepare * 1000:8.1f} ms   filter {filter_time * 1000:8.1f} ms   "
+              f"stats {stats_time * 1000:8.1f} ms   matched {matched}")
+
+
+if __name__ == "__main__":
+    main()
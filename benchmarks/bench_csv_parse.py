@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Compare CSV parsers on a synthetic wide sheet export:
+#   python benchmarks/bench_csv_parse.py --rows 500000 --columns 24
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import engine  # noqa: E402
+import settings  # noqa: E402
+
+
+# A title row followed by the header, like the sheets the apps read
+def synthetic_csv(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        kind = i % 4
+        if kind == 0:
+            data[f"Text {i}"] = rng.choice([f"Value {v}" for v in range(50)], rows)
+        elif kind == 1:
+            data[f"Price {i}"] = rng.integers(20, 200, rows) * 1000
+        elif kind == 2:
+            data[f"Score {i}"] = rng.random(rows) * 5
+        else:
+            data[f"Flag {i}"] = rng.choice(["Yes", "No", ""], rows)
+    return b"Title\n" + pd.DataFrame(data).to_csv(index=False).encode("utf-8")
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def parse_with(parser, raw, types_key=None):
+    settings.CSV_PARSER = parser
+    return engine.read_csv(raw, skip_first_row=True, types_key=types_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pandas and Arrow CSV parsing.")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--columns", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if engine.pa is None:
+        print("pyarrow is not installed", file=sys.stderr)
+        return 1
+    raw = synthetic_csv(args.rows, args.columns)
+    print(f"{args.rows} rows x {args.columns} columns, {len(raw) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    expected = parse_with("pandas", raw)
+    results = {
+        "pandas (C engine)": best_of(args.repeat, lambda: parse_with("pandas", raw)),
+    }
+
+    def first_load():
+        engine._arrow_column_types.pop("bench", None)
+        return parse_with("arrow", raw, "bench")
+
+    results["arrow, inferring types"] = best_of(args.repeat, first_load)
+    parse_with("arrow", raw, "bench")
+    results["arrow, remembered types"] = best_of(args.repeat, lambda: parse_with("arrow", raw, "bench"))
+
+    pd.testing.assert_frame_equal(parse_with("arrow", raw, "bench"), expected)
+    baseline = results["pandas (C engine)"]
+    print(f"{'parser':<26}{'seconds':>9}{'speedup':>9}")
+    for name, seconds in results.items():
+        print(f"{name:<26}{seconds:>9.3f}{baseline / seconds:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Cost of sending the results table to the browser on a wide sheet: every
+# column as a DataFrame versus the shown columns with long text cut short,
+# converted to Arrow once and reused from the result cache, e.g.
+#   python benchmarks/bench_display.py --rows 5000 --columns 80 --text-chars 400
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import datasets  # noqa: E402
+import metrics  # noqa: E402
+import settings  # noqa: E402
+
+
+def wide_frame(rows, columns, text_chars, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(["com", "pho", "bun", "banh", "mi", "ga", "bo", "chay", "nuong", "xao"])
+    data = {"Name": [f"Dish {i}" for i in range(rows)]}
+    for i in range(1, columns):
+        if i % 4 == 0:
+            data[f"Notes{i}"] = [" ".join(rng.choice(words, text_chars // 4)) for _ in range(rows)]
+        elif i % 2 == 0:
+            data[f"Cat{i}"] = rng.choice(["Rice", "Noodles", "Soup", "Bread", "Salad"], rows)
+        else:
+            data[f"Num{i}"] = rng.random(rows) * 1000
+    return pd.DataFrame(data)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the payload of the results table on a wide sheet.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--columns", type=int, default=80)
+    parser.add_argument("--text-chars", type=int, default=400, help="Length of the free-text columns")
+    parser.add_argument("--shown", type=int, default=settings.DISPLAY_COLUMNS)
+    parser.add_argument("--max-chars", type=int, default=settings.DISPLAY_MAX_CHARS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    dataset = datasets.Dataset("bench", True, wide_frame(args.rows, args.columns, args.text_chars))
+    positions = np.arange(args.rows)
+    shown = list(dataset.frame.columns[:args.shown])
+    cases = {
+        "all columns (DataFrame)": lambda: dataset.frame.iloc[positions],
+        f"{len(shown)} columns": lambda: dataset.display_table(positions, shown, 0),
+        f"{len(shown)} columns, text <= {args.max_chars}": lambda: dataset.display_table(positions, shown, args.max_chars),
+        "same, cached": lambda: dataset.display_table(positions, shown, args.max_chars, row_key="{}"),
+    }
+    print(f"{args.rows} rows x {args.columns} columns, {len(shown)} shown")
+    print(f"{'table':<34}{'build s':>9}{'IPC s':>8}{'IPC MB':>9}")
+    for name, build in cases.items():
+        build_seconds, table = best_of(args.repeat, build)
+        # What Streamlit does with the table before it is sent
+        ipc_seconds, size = best_of(args.repeat, lambda: metrics.payload_size(table))
+        print(f"{name:<34}{build_seconds:>9.3f}{ipc_seconds:>8.3f}{size / 1e6:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold-start benchmark for `import streamlit`. Each sample runs in a fresh
+# interpreter. The candidate __init__.py (this repo's lazy one by default) and
+# the baseline (the installed package's own __init__.py by default) are both
+# mounted over the installed streamlit package, so only __init__.py differs:
+#   python benchmarks/bench_import.py --runs 20
+#   python benchmarks/bench_import.py --baseline /path/to/eager/__init__.py
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Overlay package: resolve submodules from the installed streamlit, but run the
+# given __init__.py as the package body
+OVERLAY_INIT = """\
+__path__.append({package_dir!r})
+with open({init_path!r}, encoding="utf-8") as _f:
+    exec(compile(_f.read(), {init_path!r}, "exec"))
+"""
+
+# Time the import, then touch a name to make sure the module is usable
+PROBE = """\
+import sys
+import time
+start = time.perf_counter()
+import streamlit
+elapsed = time.perf_counter() - start
+streamlit.markdown
+print(elapsed, len(sys.modules))
+"""
+
+
+def installed_package_dir():
+    output = subprocess.check_output(
+        [sys.executable, "-c", "import importlib.util; print(importlib.util.find_spec('streamlit').submodule_search_locations[0])"],
+        text=True,
+    )
+    return output.strip()
+
+
+def make_overlay(init_path, package_dir):
+    root = tempfile.mkdtemp(prefix="bench_import_")
+    os.mkdir(os.path.join(root, "streamlit"))
+    with open(os.path.join(root, "streamlit", "__init__.py"), "w", encoding="utf-8") as f:
+        f.write(OVERLAY_INIT.format(package_dir=package_dir, init_path=os.path.abspath(init_path)))
+    return root
+
+
+def measure(overlay_root, runs):
+    env = dict(os.environ, PYTHONPATH=overlay_root, PYTHONDONTWRITEBYTECODE="0")
+    samples = []
+    modules = 0
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", PROBE], env=env, text=True)
+        elapsed, modules = output.strip().splitlines()[-1].split()
+        samples.append(float(elapsed))
+    return samples, int(modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cold-start import time of two streamlit __init__.py files.")
+    parser.add_argument("--candidate", default=os.path.join(REPO_ROOT, "__init__.py"))
+    parser.add_argument("--baseline", help="Eager __init__.py to compare against (default: installed streamlit's)")
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    package_dir = installed_package_dir()
+    baseline = args.baseline or os.path.join(package_dir, "__init__.py")
+
+    results = {}
+    overlays = {name: make_overlay(init_path, package_dir)
+                for name, init_path in (("baseline", baseline), ("candidate", args.candidate))}
+    try:
+        for name, overlay in overlays.items():
+            # One warm-up run so both sides start with compiled bytecode on disk
+            measure(overlay, 1)
+        # Interleave the runs so background noise hits both sides equally
+        samples = {name: [] for name in overlays}
+        for _ in range(args.runs):
+            for name, overlay in overlays.items():
+                run, modules = measure(overlay, 1)
+                samples[name].extend(run)
+                results[name] = (samples[name], modules)
+    finally:
+        for overlay in overlays.values():
+            shutil.rmtree(overlay, ignore_errors=True)
+
+    for name, (samples, modules) in results.items():
+        print(f"{name:10} median {statistics.median(samples) * 1000:8.1f} ms   "
+              f"min {min(samples) * 1000:8.1f} ms   {modules} modules   ({args.runs} runs)")
+    base = statistics.median(results["baseline"][0])
+    cand = statistics.median(results["candidate"][0])
+    print(f"cold-start change: {(cand - base) * 1000:+.1f} ms ({(cand - base) / base * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Compare loading the same sheet over the network with loading a local
+# snapshot (CSV memory-mapped from disk, Parquet, XLSX, and an upload held in
+# memory), e.g.
+#   python benchmarks/bench_ingest.py --rows 200000 --latency-ms 300 --bandwidth-mbps 50
+# The sheet is served by benchmarks/sheet_stub.py, so no network access is
+# needed; latency and bandwidth emulate the real export endpoint.
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, ".."))
+sys.path.insert(0, BENCHMARKS)
+
+import engine  # noqa: E402
+import settings  # noqa: E402
+import sheet_stub  # noqa: E402
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Name": [f"Dish {i}" for i in range(rows)],
+        "Type": rng.choice(["Rice", "Noodles", "Soup", "Bread", "Salad"], rows),
+        "Area": rng.choice([f"District {i}" for i in range(1, 13)], rows),
+        "Vegetarian": rng.choice(["Yes", "No"], rows),
+        "Price": rng.integers(20, 200, rows) * 1000,
+        "Rating": rng.random(rows) * 5,
+    })
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark local file ingestion against loading the sheet over HTTP.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Emulated latency of the sheet export")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Emulated bandwidth (0 = unlimited)")
+    parser.add_argument("--xlsx-rows", type=int, default=20_000,
+                        help="Rows in the XLSX case (writing big workbooks is slow); 0 skips it")
+    args = parser.parse_args(argv)
+
+    frame = synthetic_frame(args.rows)
+    workdir = tempfile.mkdtemp(prefix="bench-ingest-")
+    try:
+        csv_path = os.path.join(workdir, "sheet.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            # Title row first, like the sheets the app reads
+            f.write("Synthetic food sheet\n")
+            frame.to_csv(f, index=False)
+        parquet_path = os.path.join(workdir, "sheet.parquet")
+        engine.export(frame, parquet_path)
+        with open(csv_path, "rb") as f:
+            upload = f.read()
+        print(f"{args.rows} rows, CSV {os.path.getsize(csv_path) / 1e6:.1f} MB, "
+              f"Parquet {os.path.getsize(parquet_path) / 1e6:.1f} MB, parser {settings.CSV_PARSER}, {os.cpu_count()} CPUs")
+
+        server, base_url = sheet_stub.start(csv_path, latency_ms=args.latency_ms, bandwidth_mbps=args.bandwidth_mbps)
+        settings.SHEETS_BASE_URL = base_url
+        cases = {
+            "sheet over HTTP": lambda: engine.load_source("https://docs.google.com/spreadsheets/d/bench/edit"),
+            "local CSV (mmap)": lambda: engine.load_source(csv_path),
+            "uploaded CSV": lambda: engine.read_file(io.BytesIO(upload), "sheet.csv"),
+            "local Parquet": lambda: engine.load_source(parquet_path),
+        }
+        if args.xlsx_rows:
+            xlsx_path = os.path.join(workdir, "sheet.xlsx")
+            small = frame.head(args.xlsx_rows)
+            engine.export(small, xlsx_path)
+            # XLSX snapshots have no title row
+            cases[f"local XLSX ({len(small)} rows)"] = lambda: engine.read_file(xlsx_path, skip_first_row=False)
+        try:
+            results = {}
+            for name, load in cases.items():
+                try:
+                    results[name] = best_of(args.repeat, load)
+                except ImportError as e:
+                    print(f"{name}: skipped ({e})")
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = results["sheet over HTTP"][0]
+    print(f"{'source':<28}{'seconds':>9}{'rows/s':>12}{'speedup':>9}")
+    for name, (seconds, loaded) in results.items():
+        print(f"{name:<28}{seconds:>9.3f}{len(loaded) / seconds:>12,.0f}{baseline / seconds:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Warm-up cost after a refresh: a full rebuild of the profile, indexes and
+# stats versus updating the previous snapshot's with the changed rows, e.g.
+#   python benchmarks/bench_refresh.py --rows 500000 --appended 100 1000 10000 --edited 100
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import datasets  # noqa: E402
+
+
+def synthetic_frame(rows, seed=0, start=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Name": [f"Dish {i}" for i in range(start, start + rows)],
+        "Type": rng.choice(["Rice", "Noodles", "Soup", "Bread", "Salad"], rows),
+        "Area": rng.choice([f"District {i}" for i in range(1, 13)], rows),
+        "Price": rng.integers(20, 200, rows) * 1000,
+        "Rating": np.round(rng.random(rows) * 5, 1),
+    })
+
+
+# What warmup.warm does after a load
+def warm(dataset):
+    dataset.unique_counts()
+    dataset.build_indexes()
+    dataset.column_stats()
+    for column in ("Type", "Area"):
+        dataset.filter_options(column)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark incremental refreshes of a cached dataset.")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--appended", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--edited", type=int, nargs="+", default=[100])
+    args = parser.parse_args(argv)
+
+    base = synthetic_frame(args.rows)
+    previous = datasets.Dataset("bench", True, base)
+    seconds, _ = timed(lambda: warm(previous))
+    print(f"{args.rows} rows, first warm-up {seconds:.3f}s")
+    print(f"{'change':<18}{'hash rows s':>12}{'rebuild s':>11}{'incremental s':>15}{'speedup':>9}")
+
+    changes = [(f"append {count}", pd.concat([base, synthetic_frame(count, seed=count, start=args.rows)],
+                                             ignore_index=True)) for count in args.appended]
+    for count in args.edited:
+        edited = base.copy()
+        rows = np.random.default_rng(count).choice(args.rows, count, replace=False)
+        edited.loc[rows, "Price"] = edited.loc[rows, "Price"] + 1000
+        changes.append((f"edit {count}", edited))
+
+    for name, frame in changes:
+        load, fresh = timed(lambda: datasets.Dataset("bench", True, frame))
+        rebuild, _ = timed(lambda: warm(fresh))
+        refreshed = datasets.Dataset("bench", True, frame)
+        inherit, changed = timed(lambda: refreshed.inherit(previous))
+        if changed is None:
+            print(f"{name:<18}{load:>12.3f}{rebuild:>11.3f}{'rebuilt':>15}")
+            continue
+        update, _ = timed(lambda: warm(refreshed))
+        incremental = inherit + update
+        print(f"{name:<18}{load:>12.3f}{rebuild:>11.3f}{incremental:>15.3f}{rebuild / incremental:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
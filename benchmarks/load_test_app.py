@@ -0,0 +1,238 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Load test for app_enhanced.py: N simulated sessions run scripted
+# interactions in-process (Streamlit's AppTest), with the sheet served by
+# benchmarks/sheet_stub.py, e.g.
+#   python benchmarks/load_test_app.py --sessions 1 5 10 20 --iterations 20
+#   python benchmarks/load_test_app.py --csv snapshot.csv --no-skip-first-row --sessions 10
+# Reports rerun latency percentiles per interaction, throughput and how much
+# the process RSS grows per session.
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(BENCHMARKS, "..", "app_enhanced.py")
+sys.path.insert(0, os.path.join(BENCHMARKS, ".."))
+sys.path.insert(0, BENCHMARKS)
+
+import sheet_stub  # noqa: E402
+
+
+# AppTest is built for one app at a time: each run installs its own runtime
+# singleton (and clears it afterwards) and compiles the script with a fresh
+# cache. A real server has one runtime and compiles the script once for all
+# sessions, so emulate that to let sessions run side by side (concurrent
+# compiles also trip CPython 3.11's thread-unsafe ast.parse).
+def share_runtime():
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import script_cache
+
+    shared = {"runtime": None, "cache": script_cache.ScriptCache()}
+    lock = threading.Lock()
+    get_bytecode = script_cache.ScriptCache.get_bytecode
+
+    def shared_get_bytecode(self, script_path):
+        with lock:
+            return get_bytecode(shared["cache"], script_path)
+
+    def instance(cls):
+        if cls._instance is not None:
+            shared["runtime"] = cls._instance
+        if shared["runtime"] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return shared["runtime"]
+
+    def exists(cls):
+        return cls._instance is not None or shared["runtime"] is not None
+
+    script_cache.ScriptCache.get_bytecode = shared_get_bytecode
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def synthetic_sheet(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Name": [f"Dish {i}" for i in range(rows)],
+        "Type": rng.choice(["Rice", "Noodles", "Soup", "Bread", "Salad"], rows),
+        "Area": rng.choice([f"District {i}" for i in range(1, 13)], rows),
+        "Vegetarian": rng.choice(["Yes", "No"], rows),
+        "Price": rng.integers(20, 200, rows) * 1000,
+        "Rating": np.round(rng.random(rows) * 5, 1),
+    })
+    handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+    with handle:
+        # Title row first, like the sheets the app reads
+        handle.write("Synthetic food sheet\n")
+        frame.to_csv(handle, index=False)
+    return handle.name
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+
+        # Peak rather than current RSS where /proc is not available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class Session:
+    def __init__(self, index, iterations, think, results, errors):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP, default_timeout=120)
+        self.rng = random.Random(index)
+        self.iterations = iterations
+        self.think = think
+        self.results = results
+        self.errors = errors
+
+    def _timed(self, action, element):
+        start = time.perf_counter()
+        element.run()
+        self.results.append((action, time.perf_counter() - start))
+        if self.app.exception:
+            self.errors.append(f"{action}: {self.app.exception[0].message}")
+        if self.think:
+            time.sleep(self.think)
+
+    def _widgets(self, prefixes):
+        return [widget for widget in list(self.app.multiselect) + list(self.app.slider)
+                if widget.key and widget.key.startswith(prefixes)]
+
+    def _button(self, label):
+        return next((button for button in self.app.button if button.label.startswith(label)), None)
+
+    def toggle_filter(self):
+        widgets = self._widgets(("few_", "many_", "toomany_"))
+        if widgets:
+            widget = self.rng.choice(widgets)
+            option = self.rng.choice(widget.options)
+            if option in widget.value:
+                widget.unselect(option)
+            else:
+                widget.select(option)
+            self._timed("toggle_filter", widget)
+
+    def move_slider(self):
+        widgets = self._widgets(("numeric_",))
+        if widgets:
+            widget = self.rng.choice(widgets)
+            low, high = widget.min, widget.max
+            a, b = sorted(self.rng.uniform(low, high) for _ in range(2))
+            self._timed("move_slider", widget.set_value((a, b)))
+
+    def pick(self):
+        button = self._button("Select ")
+        if button is not None:
+            self._timed("pick", button.click())
+
+    def export(self):
+        button = self._button("Download as CSV")
+        if button is not None:
+            self._timed("export", button.click())
+
+    def run(self):
+        try:
+            self._timed("load", self.app)
+            chooser = self.app.multiselect(key="filter_columns")
+            # A couple of text columns and one numeric column, like a user would
+            for column in self.rng.sample(chooser.options, min(3, len(chooser.options))):
+                chooser.select(column)
+            self._timed("add_filter", chooser)
+            actions = [self.toggle_filter, self.toggle_filter, self.move_slider, self.pick, self.export]
+            for _ in range(self.iterations):
+                self.rng.choice(actions)()
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def run_level(count, args):
+    results = []
+    errors = []
+    before = rss_mb()
+    sessions = [Session(index, args.iterations, args.think_ms / 1000, results, errors) for index in range(count)]
+    threads = [threading.Thread(target=session.run, name=f"session-{i}") for i, session in enumerate(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    # Sessions (and their session state) are still alive here
+    after = rss_mb()
+    return results, errors, elapsed, before, after, sessions
+
+
+def report(count, results, errors, elapsed, before, after):
+    print(f"\n{count} concurrent session(s): {len(results)} reruns in {elapsed:.2f}s, "
+          f"{len(results) / elapsed:.1f} reruns/s, {len(errors)} error(s)")
+    print(f"  RSS {before:.0f} MB -> {after:.0f} MB, {(after - before) / count:.1f} MB per session")
+    print(f"  {'action':<14}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    actions = sorted({action for action, _ in results})
+    for action in actions + ["all"]:
+        values = sorted(seconds * 1000 for name, seconds in results if action in ("all", name))
+        print(f"  {action:<14}{len(values):>7}{_percentile(values, 0.5):>9.1f}{_percentile(values, 0.95):>9.1f}"
+              f"{_percentile(values, 0.99):>9.1f}{values[-1] if values else 0:>9.1f}")
+    for error in errors[:5]:
+        print(f"  error: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test app_enhanced.py with simulated sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10],
+                        help="Concurrent sessions per run; several values run one after another")
+    parser.add_argument("--iterations", type=int, default=20, help="Scripted interactions per session")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between interactions")
+    parser.add_argument("--csv", help="Sheet snapshot to serve (default: synthetic)")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows in the synthetic sheet")
+    parser.add_argument("--no-skip-first-row", action="store_true", help="The CSV has no title row")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Emulated latency of the sheet fetch")
+    args = parser.parse_args(argv)
+
+    path = args.csv or synthetic_sheet(args.rows)
+    if args.no_skip_first_row:
+        # The app skips row 1 by default; give it a title row to skip
+        with open(path, "rb") as f:
+            body = f.read()
+        path = tempfile.NamedTemporaryFile(suffix=".csv", delete=False).name
+        with open(path, "wb") as f:
+            f.write(b"Snapshot\n" + body)
+    server, base_url = sheet_stub.start(path, latency_ms=args.latency_ms)
+    # Settings are read on first import, so these must be set before the app runs
+    os.environ["FOOD_SHEETS_BASE_URL"] = base_url
+    os.environ["FOOD_SHEET_URL"] = "https://docs.google.com/spreadsheets/d/load-test/edit"
+    os.environ["FOOD_WARMUP_SHEETS"] = ""
+
+    share_runtime()
+    print(f"Serving {path} at {base_url}; {os.cpu_count()} CPUs")
+    try:
+        # One untimed session first: imports and the first sheet load are a
+        # one-off cost of the process, not of each session
+        results, errors, elapsed, _, after, _ = run_level(1, argparse.Namespace(iterations=0, think_ms=0))
+        print(f"Process warm-up: first load {elapsed:.2f}s, RSS {after:.0f} MB" + (f", error: {errors[0]}" if errors else ""))
+        for count in args.sessions:
+            report(count, *run_level(count, args)[:5])
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Load test for the pick service (service.py). By default it starts the
+# service in-process on a local CSV snapshot, so nothing leaves the machine:
+#   python benchmarks/load_test_service.py --csv snapshot.csv --filters '{"Type": ["Rice"]}'
+# or point it at a running service:
+#   python benchmarks/load_test_service.py --url http://127.0.0.1:8600
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def worker(host, port, body, deadline, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("POST", "/pick", body=body(), headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the pick service.")
+    parser.add_argument("--url", help="Running service to test (default: start one in-process)")
+    parser.add_argument("--csv", help="CSV snapshot served by the in-process service")
+    parser.add_argument("--skip-first-row", action="store_true")
+    parser.add_argument("--filters", default="{}", help="JSON filter spec sent with every request")
+    parser.add_argument("--count", type=int, default=5, help="Rows per pick")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--port", type=int, default=18600, help="Port for the in-process service")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        if not args.csv:
+            parser.error("--csv is required when no --url is given")
+        import datasets
+        import service
+        service.add_source(args.csv, args.skip_first_row)
+        datasets.get_dataset(args.csv, args.skip_first_row).build_indexes()
+        server = service.start_server(port=args.port, host="127.0.0.1")
+        host, port = server.server_address
+
+    filters = json.loads(args.filters)
+
+    def body():
+        return json.dumps({"filters": filters, "count": args.count, "seed": random.random()})
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(host, port, body, deadline, latencies, errors))
+               for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests:    {len(latencies)} ok, {len(errors)} errors in {elapsed:.1f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.0f} req/s with {args.concurrency} clients")
+    print(f"latency p50: {_percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"latency p95: {_percentile(latencies, 0.95) * 1000:.2f} ms")
+    print(f"latency p99: {_percentile(latencies, 0.99) * 1000:.2f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import argparse
+import csv
+import io
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+# Local stand-in for the Google Sheets endpoints the viewer uses, so tests,
+# benchmarks and load tests run without network access:
+#   /spreadsheets/d/<id>/export?format=csv     the whole sheet as CSV
+#   /spreadsheets/d/<id>/gviz/tq?tqx=out:csv   the query subset engine.py emits
+#
+#   python benchmarks/sheet_stub.py --csv food.csv --port 8700
+#   FOOD_SHEETS_BASE_URL=http://127.0.0.1:8700 streamlit run app_enhanced.py
+#
+# Every sheet ID serves the same CSV unless --sheet ID=PATH pairs are given.
+# --latency-ms and --bandwidth-mbps roughly emulate a remote server.
+
+
+def _letters(count):
+    # Same column IDs as engine.column_letter
+    names = []
+    for index in range(count):
+        letters, index = "", index + 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(ord("A") + remainder) + letters
+        names.append(letters)
+    return names
+
+
+_CONDITION = re.compile(r"^([A-Z]+)\s*(=|>=|<=)\s*(.+)$")
+
+
+def _literal(text):
+    text = text.strip()
+    if text[:1] in ("'", '"') and text[-1:] == text[:1]:
+        return text[1:-1]
+    return float(text)
+
+
+def _split_top_level(text, keyword):
+    # Split on " and " / " or " outside quotes and parentheses
+    parts, depth, quote, start, i = [], 0, None, 0, 0
+    token = f" {keyword} "
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and text.startswith(token, i):
+            parts.append(text[start:i])
+            i += len(token)
+            start = i
+            continue
+        i += 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+
+# True when the whole expression sits inside one pair of parentheses
+def _wrapped(text):
+    if not text.startswith("("):
+        return False
+    depth, quote = 0, None
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i == len(text) - 1
+    return False
+
+
+def _mask(frame, ids, expression):
+    expression = expression.strip()
+    if _wrapped(expression):
+        expression = expression[1:-1]
+    alternatives = _split_top_level(expression, "or")
+    if len(alternatives) > 1:
+        mask = pd.Series(False, index=frame.index)
+        for alternative in alternatives:
+            mask |= _mask(frame, ids, alternative)
+        return mask
+    conjuncts = _split_top_level(expression, "and")
+    if len(conjuncts) > 1:
+        mask = pd.Series(True, index=frame.index)
+        for conjunct in conjuncts:
+            mask &= _mask(frame, ids, conjunct)
+        return mask
+    match = _CONDITION.match(expression)
+    if not match:
+        raise ValueError(f"Unsupported condition: {expression}")
+    letter, operator, literal = match.groups()
+    column = frame[ids[letter]]
+    value = _literal(literal)
+    if isinstance(value, str) and pd.api.types.is_numeric_dtype(column.dtype):
+        raise ValueError(f"Can't compare number column {letter} with text")
+    if operator == "=":
+        return column == value
+    if operator == ">=":
+        return column >= value
+    return column <= value
+
+
+# Run the subset of the query language that engine.build_gviz_query emits
+def run_query(frame, query):
+    match = re.match(r"^select\s+(.+?)(?:\s+where\s+(.+?))?(?:\s+limit\s+(\d+))?$", query.strip(), re.S)
+    if not match:
+        raise ValueError(f"Unsupported query: {query}")
+    select, where, limit = match.groups()
+    ids = dict(zip(_letters(len(frame.columns)), frame.columns))
+    if where:
+        frame = frame[_mask(frame, ids, where)]
+    if select.strip() != "*":
+        frame = frame[[ids[letter.strip()] for letter in select.split(",")]]
+    if limit is not None:
+        frame = frame.head(int(limit))
+    return frame
+
+
+class SheetStub:
+    def __init__(self, default_csv=None, sheets=None, latency_ms=0.0, bandwidth_mbps=0.0):
+        self.default_csv = default_csv
+        self.sheets = dict(sheets or {})
+        self.latency = latency_ms / 1000
+        self.bandwidth = bandwidth_mbps * 1_000_000 / 8
+        self.requests = []
+        self._raw = {}
+        self._lock = threading.Lock()
+
+    def raw(self, sheet_id):
+        path = self.sheets.get(sheet_id, self.default_csv)
+        if path is None:
+            return None
+        with self._lock:
+            if path not in self._raw:
+                with open(path, "rb") as f:
+                    self._raw[path] = f.read()
+            return self._raw[path]
+
+    def query(self, sheet_id, params):
+        raw = self.raw(sheet_id)
+        skip_rows = 0
+        if "range" in params:
+            # Only the "A<row>:..." form engine.py uses
+            skip_rows = int(re.match(r"[A-Z]+(\d+)", params["range"]).group(1)) - 1
+        frame = pd.read_csv(io.BytesIO(raw), skiprows=skip_rows)
+        result = run_query(frame, params.get("tq", "select *"))
+        # The real endpoint quotes every field
+        return result.to_csv(index=False, quoting=csv.QUOTE_ALL).encode("utf-8")
+
+
+def _handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            match = re.match(r"^/spreadsheets/d/([^/]+)/(export|gviz/tq)$", url.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            stub.requests.append(self.path)
+            if not match or stub.raw(match.group(1)) is None:
+                self._send(404, b"Not found", "text/plain")
+                return
+            sheet_id, endpoint = match.groups()
+            try:
+                body = stub.raw(sheet_id) if endpoint == "export" else stub.query(sheet_id, params)
+            except (ValueError, KeyError) as e:
+                self._send(400, str(e).encode("utf-8"), "text/plain")
+                return
+            self._send(200, body, "text/csv; charset=utf-8")
+
+        def _send(self, status, body, content_type):
+            if stub.latency:
+                time.sleep(stub.latency)
+            if stub.bandwidth:
+                time.sleep(len(body) / stub.bandwidth)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# Start a stub in a background thread; returns (server, base_url)
+def start(default_csv=None, sheets=None, port=0, latency_ms=0.0, bandwidth_mbps=0.0):
+    stub = SheetStub(default_csv, sheets, latency_ms, bandwidth_mbps)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(stub))
+    server.daemon_threads = True
+    server.stub = stub
+    threading.Thread(target=server.serve_forever, name="sheet-stub", daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local CSV files like public Google Sheets.")
+    parser.add_argument("--csv", help="CSV served for every sheet ID")
+    parser.add_argument("--sheet", action="append", default=[], help="ID=PATH pair (repeatable)")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    sheets = dict(pair.split("=", 1) for pair in args.sheet)
+    server, base_url = start(args.csv, sheets, args.port, args.latency_ms, args.bandwidth_mbps)
+    print(f"Serving sheets at {base_url} (set FOOD_SHEETS_BASE_URL={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import engine
+
+# Batch filtering and sampling without Streamlit, e.g.
+#   python cli.py --sheet URL --csv snapshot.csv --filters veg.json --sample 5
+#   python cli.py --csv a.csv --csv b.csv --filters veg.json --output out/ --format xlsx --jobs 4
+#   python cli.py --sheet URL --filters veg.json --columns Name,Price --pushdown
+
+
+def _output_name(source, index):
+    if engine.is_sheet_url(source):
+        return f"sheet_{index}_{engine.parse_sheet_id(source)}"
+    return f"{index}_{Path(source).stem}"
+
+
+# Run one source end to end; executed in a worker process
+def run_job(job):
+    source = job["source"]
+    try:
+        if job["pushdown"] and engine.is_sheet_url(source):
+            # Only matching rows come over the network; the total is unknown
+            data = None
+            filtered, pushed_down = engine.load_sheet_pushdown(source, job["skip_first_row"], job["filters"],
+                                                               job["columns"])
+        else:
+            pushed_down = False
+            data = engine.load_source(source, job["skip_first_row"])
+            filtered = engine.apply_filters(data, job["filters"])
+            if job["columns"]:
+                filtered = filtered[[column for column in job["columns"] if column in filtered.columns]]
+        result = filtered
+        if job["sample"] is not None:
+            rng = random.Random(job["seed"]) if job["seed"] is not None else random
+            result = engine.sample_rows(filtered, job["sample"], rng)
+
+        summary = {
+            "source": source,
+            "rows": int(data.shape[0]) if data is not None else None,
+            "filtered_rows": int(filtered.shape[0]),
+            "output_rows": int(result.shape[0]),
+            "pushdown": pushed_down,
+        }
+        if job["output"]:
+            path = Path(job["output"]) / f"{_output_name(source, job['index'])}.{job['format']}"
+            summary["path"] = str(engine.export(result, path))
+        else:
+            summary["csv"] = result.to_csv(index=False)
+        return summary
+    except Exception as e:
+        return {"source": source, "error": str(e)}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Filter, sample and export Google Sheets or CSV snapshots.")
+    parser.add_argument("--sheet", action="append", default=[], help="Public Google Sheet URL (repeatable)")
+    parser.add_argument("--csv", action="append", default=[], help="Local CSV, XLSX or Parquet snapshot (repeatable)")
+    parser.add_argument("--filters", help='JSON filter spec, e.g. {"Type": ["Rice"], "Price": {"max": 50000}}')
+    parser.add_argument("--sample", type=int, help="Randomly select this many rows from each filtered source")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible samples")
+    parser.add_argument("--output", help="Directory to write one file per source to (default: print CSV)")
+    parser.add_argument("--format", choices=["csv", "xlsx", "parquet"], default="csv", help="Export format for --output")
+    parser.add_argument("--columns", help="Comma-separated columns to keep in the output")
+    parser.add_argument("--pushdown", action="store_true",
+                        help="Let Google filter sheets server-side and download only matching rows")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes")
+    skip = parser.add_mutually_exclusive_group()
+    skip.add_argument("--skip-first-row", dest="skip_first_row", action="store_true", default=None,
+                      help="Use row 2 as header (default for sheets)")
+    skip.add_argument("--no-skip-first-row", dest="skip_first_row", action="store_false",
+                      help="Use row 1 as header (default for CSV snapshots)")
+    return parser
+
+
+def load_filter_spec(value):
+    if not value:
+        return {}
+    # Accept either inline JSON or a path to a JSON file. Inline JSON is
+    # recognised first: a long spec is not a valid file name.
+    text = value
+    if not value.lstrip().startswith("{"):
+        path = Path(value)
+        if path.is_file():
+            text = path.read_text(encoding="utf-8")
+    return engine.normalize_filters(json.loads(text))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sources = args.sheet + args.csv
+    if not sources:
+        print("No sources given; use --sheet and/or --csv", file=sys.stderr)
+        return 2
+
+    try:
+        filters = load_filter_spec(args.filters)
+    except (OSError, TypeError, ValueError) as e:
+        # json.JSONDecodeError is a ValueError
+        print(f"Invalid --filters: {e}", file=sys.stderr)
+        return 2
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else None
+    if args.output:
+        Path(args.output).mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    for index, source in enumerate(sources):
+        skip_first_row = args.skip_first_row
+        if skip_first_row is None:
+            skip_first_row = engine.is_sheet_url(source)
+        jobs.append({
+            "index": index,
+            "source": source,
+            "skip_first_row": skip_first_row,
+            "filters": filters,
+            "columns": columns,
+            "pushdown": args.pushdown,
+            "sample": args.sample,
+            "seed": args.seed,
+            "output": args.output,
+            "format": args.format,
+        })
+
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(run_job, jobs))
+    else:
+        results = [run_job(job) for job in jobs]
+
+    exit_code = 0
+    for result in results:
+        if "error" in result:
+            print(f"# {result['source']}: error: {result['error']}", file=sys.stderr)
+            exit_code = 1
+            continue
+        if result["pushdown"]:
+            total = "filtered at source"
+        elif result["rows"] is not None:
+            total = f"{result['rows']} total"
+        else:
+            total = "pushdown failed, whole sheet downloaded"
+        print(f"# {result['source']}: {result['output_rows']} of {result['filtered_rows']} filtered rows "
+              f"({total})", file=sys.stderr)
+        if "path" in result:
+            print(result["path"])
+        else:
+            sys.stdout.write(result["csv"])
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+import settings
+
+# Turn text columns that hold formatted numbers ("45.000đ", "1,234.5",
+# "12%") or dates ("31/12/2024") into numeric and datetime columns once, when
+# a sheet is loaded, so they get range filters instead of huge multiselects.
+# Work is done on each column's distinct values and mapped back to the rows.
+
+CURRENCY_PREFIXES = r"\$|€|£|¥|₫|usd|eur|vnd|vnđ"
+CURRENCY_SUFFIXES = r"\$|€|£|¥|₫|đ|vnđ|vnd|đồng|dong|usd|eur|k"
+NUMBER = (rf"^(?P<prefix>{CURRENCY_PREFIXES})?\s*(?P<number>[+-]?[\d.,\s']*\d)\s*"
+          rf"(?P<suffix>%|{CURRENCY_SUFFIXES})?$")
+DATE = r"^(?P<a>\d{1,4})[-/.](?P<b>\d{1,2})[-/.](?P<c>\d{1,4})(?:[ T](?P<time>\d{1,2}:\d{2}(?::\d{2})?))?$"
+
+# Distinct values looked at before deciding whether a column is worth parsing,
+# and the share of them that must parse. The whole column must parse to be
+# converted; a column that nearly does is reported with the cells in the way.
+SAMPLE_SIZE = 200
+SAMPLE_MIN_SHARE = 0.9
+
+
+def _is_text(values):
+    return values.dtype == object or pd.api.types.is_string_dtype(values.dtype)
+
+
+# Which of "." and "," separates thousands and which decimals, judged over
+# the whole column so "1.234" means the same thing in every row
+def _separators(numbers):
+    both = numbers[numbers.str.contains(".", regex=False) & numbers.str.contains(",", regex=False)]
+    if len(both):
+        # The separator written last is the decimal one ("1.234,5")
+        comma_last = (both.str.rfind(",") > both.str.rfind(".")).mean() >= 0.5
+        return (".", ",") if comma_last else (",", ".")
+    for separator, other in ((".", ","), (",", ".")):
+        with_separator = numbers[numbers.str.contains(separator, regex=False)]
+        if not len(with_separator):
+            continue
+        # Groups of exactly three digits ("45.000", "1,234,567") are
+        # thousands; "0.100" has a leading zero group, so it is a decimal
+        grouped = with_separator.str.fullmatch(rf"[+-]?[1-9]\d{{0,2}}(?:\{separator}\d{{3}})+")
+        if grouped.all():
+            return separator, other
+        return other, separator
+    return ",", "."
+
+
+# Parse formatted numbers; returns (values, kind, detail) for the distinct
+# `texts`, NaN where a text doesn't parse
+def parse_numbers(texts):
+    parts = texts.str.lower().str.extract(NUMBER)
+    matched = parts["number"].notna()
+    suffix = parts["suffix"].fillna("")
+    percent = matched & (suffix == "%")
+    currency = matched & ((parts["prefix"].fillna("") != "") | ((suffix != "") & (suffix != "%")))
+    if percent.any() and not percent[matched].all():
+        # Percentages mixed with plain numbers would mean different scales
+        matched &= ~percent
+    numbers = parts["number"].where(matched).str.replace(r"[\s']", "", regex=True)
+    # Phone numbers and codes keep their leading zero as text
+    matched &= ~numbers.str.match(r"[+-]?0\d").fillna(False).astype(bool)
+    numbers = numbers.where(matched)
+    thousands, decimal = _separators(numbers.dropna())
+    cleaned = numbers.str.replace(thousands, "", regex=False).str.replace(decimal, ".", regex=False)
+    values = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    values = np.where(percent, values / 100, values)
+    # "45k" is 45,000 on Vietnamese menus
+    values = np.where(matched & (suffix == "k"), values * 1000, values)
+    if percent[matched].any():
+        kind = "percent"
+    elif currency[matched].any():
+        kind = "currency"
+    else:
+        kind = "number"
+    return values, kind, f"thousands '{thousands}', decimal '{decimal}'"
+
+
+# Parse dates written as day/month/year, month/day/year or year/month/day
+# (any of - / . as separator, optional time); returns (values, kind, detail)
+def parse_dates(texts):
+    parts = texts.str.strip().str.extract(DATE)
+    a = pd.to_numeric(parts["a"], errors="coerce")
+    b = pd.to_numeric(parts["b"], errors="coerce")
+    c = pd.to_numeric(parts["c"], errors="coerce")
+    if (parts["a"].str.len() == 4).any():
+        order, year, month, day = "year-first", a, b, c
+    elif (a > 12).any():
+        order, year, month, day = "day-first", c, b, a
+    elif (b > 12).any():
+        order, year, month, day = "month-first", c, a, b
+    elif settings.DATE_ORDER == "mdy":
+        order, year, month, day = "month-first (assumed)", c, a, b
+    else:
+        order, year, month, day = "day-first (assumed)", c, b, a
+    year = year.where(year >= 100, year + 2000)
+    values = pd.to_datetime(pd.DataFrame({"year": year, "month": month, "day": day}), errors="coerce")
+    time = parts["time"].where(parts["time"].str.count(":") == 2, parts["time"] + ":00")
+    values = values + pd.to_timedelta(time, errors="coerce").fillna(pd.Timedelta(0))
+    return values.to_numpy(dtype="datetime64[ns]"), "date", order
+
+
+# Try to convert one text column; returns (converted values or None, report).
+# Only columns whose every non-blank cell parses are converted, since the
+# converted frame is also what gets exported and served: a column held back
+# by a few cells stays text, and the report names them.
+def coerce_column(values):
+    report = {"column": str(values.name), "kind": "text", "from": str(values.dtype), "to": str(values.dtype),
+              "rows": 0, "converted": 0, "unparsed": 0, "detail": "", "examples": ""}
+    # Cheap look at the first values; most text columns bail out here
+    sample = values.head(SAMPLE_SIZE * 5).dropna().astype(str).str.strip()
+    sample = pd.Series(sample[sample != ""].unique()[:SAMPLE_SIZE], dtype=object)
+    parsers = [parse for parse in (parse_numbers, parse_dates)
+               if len(sample) and 1 - pd.isna(parse(sample)[0]).mean() >= SAMPLE_MIN_SHARE]
+    if not parsers:
+        report["rows"] = int(values.notna().sum())
+        return None, report
+
+    codes, uniques = pd.factorize(values)
+    texts = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    blank = (texts == "").to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    rows = int(counts[~blank].sum())
+    report["rows"] = rows
+    if not rows:
+        return None, report
+
+    best = None
+    for parse in parsers:
+        parsed, kind, detail = parse(texts)
+        ok = ~pd.isna(parsed) & ~blank
+        share = counts[ok].sum() / rows
+        if best is None or share > best[0]:
+            best = (share, parsed, ok, kind, detail)
+    share, parsed, ok, kind, detail = best
+    failed = ~ok & ~blank
+    if failed.any():
+        report.update({
+            "unparsed": int(counts[failed].sum()),
+            "detail": f"{kind}, {detail}" if detail != kind else kind,
+            "examples": ", ".join(texts[failed][:3]),
+        })
+        return None, report
+
+    converted = parsed[np.maximum(codes, 0)]
+    converted[codes < 0] = np.datetime64("NaT") if kind == "date" else np.nan
+    if kind != "date" and not np.isnan(converted).any():
+        # Whole numbers without gaps become integers, as read_csv would make them
+        if (converted == np.round(converted)).all() and np.abs(converted).max(initial=0) < 2 ** 53:
+            converted = converted.astype("int64")
+    report.update({
+        "kind": kind,
+        "to": str(converted.dtype),
+        "converted": int(counts[ok].sum()),
+        "detail": detail,
+    })
+    return pd.Series(converted, index=values.index, name=values.name), report
+
+
+# Convert every text column whose non-blank cells all parse as numbers or
+# dates; returns the new frame and a report row per text column
+def coerce_frame(frame):
+    report = []
+    converted = {}
+    for column in frame.columns:
+        values = frame[column]
+        if not _is_text(values):
+            continue
+        result, column_report = coerce_column(values)
+        report.append(column_report)
+        if result is not None:
+            converted[column] = result
+    if converted:
+        frame = frame.copy(deep=False)
+        for column, values in converted.items():
+            frame[column] = values
+    return frame, report
@@ -0,0 +1,471 @@
+import datetime
+import hashlib
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import backends
+import engine
+import memory
+import metrics
+import result_cache
+import sampling
+import settings
+
+logger = metrics.get_logger(__name__)
+
+# Process-wide store of loaded datasets. The Streamlit app, the pick service
+# and any warm-up code running in the same process share one snapshot per
+# source instead of each keeping (and copying) their own.
+
+
+_NO_DATE = np.iinfo("int64").max
+
+
+# Values of a range-filtered column: float64, or for dates int64 nanosecond
+# timestamps (exact, unlike float64) with NaT sorting last like NaN
+def range_values(values):
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return np.where(values.isna().to_numpy(), _NO_DATE, values.to_numpy(dtype="datetime64[ns]").view("int64"))
+    return values.to_numpy(dtype="float64")
+
+
+# A range bound in the same terms; open ends (+-inf) of a date range stop
+# short of NaT
+def range_key(value, dates):
+    if not dates:
+        return value
+    if isinstance(value, (pd.Timestamp, datetime.date, np.datetime64)):
+        return pd.Timestamp(value).value
+    return _NO_DATE - 1 if value > 0 else -_NO_DATE
+
+
+class ColumnIndex:
+    def __init__(self, values):
+        self.numeric = engine.is_range_dtype(values.dtype)
+        if self.numeric:
+            # Sort order for range lookups; NaN sorts last and never matches
+            array = range_values(values)
+            self.order = np.argsort(array, kind="stable")
+            self.sorted_values = array[self.order]
+        # Value -> row positions for multiselect lookups
+        self.positions = {key: np.asarray(rows) for key, rows in values.groupby(values, sort=False).indices.items()}
+        self._text_positions = None
+        self.nbytes = sum(rows.nbytes for rows in self.positions.values())
+        if self.numeric:
+            self.nbytes += self.order.nbytes + self.sorted_values.nbytes
+
+    # Index of the next snapshot, where the rows at `removed` lost their
+    # `old_values` and the rows at `added` got `new_values`. Only the value
+    # groups those rows touch are rewritten; new numeric values are merged
+    # into the sort order instead of sorting the whole column again.
+    def updated(self, old_values, removed, new_values, added):
+        index = ColumnIndex.__new__(ColumnIndex)
+        index.numeric = self.numeric
+        index._text_positions = None
+        positions = dict(self.positions)
+        nbytes = self.nbytes
+        # Position arrays are sorted, and so are `removed` and `added`
+        for key, rows in old_values.groupby(old_values, sort=False).indices.items():
+            existing = positions.pop(key)
+            nbytes -= existing.nbytes
+            kept = np.delete(existing, np.searchsorted(existing, removed[rows]))
+            if len(kept):
+                positions[key] = kept
+                nbytes += kept.nbytes
+        for key, rows in new_values.groupby(new_values, sort=False).indices.items():
+            existing = positions.get(key)
+            rows = added[rows]
+            if existing is not None:
+                nbytes -= existing.nbytes
+                rows = np.insert(existing, np.searchsorted(existing, rows), rows)
+            positions[key] = rows
+            nbytes += rows.nbytes
+        index.positions = positions
+        if self.numeric:
+            order = self.order
+            sorted_values = self.sorted_values
+            if len(removed):
+                gone = np.zeros(max(len(order), int(removed.max()) + 1), dtype=bool)
+                gone[removed] = True
+                keep = ~gone[order]
+                order = order[keep]
+                sorted_values = sorted_values[keep]
+            array = range_values(new_values)
+            new_order = np.argsort(array, kind="stable")
+            at = np.searchsorted(sorted_values, array[new_order], side="right")
+            index.order = np.insert(order, at, added[new_order])
+            index.sorted_values = np.insert(sorted_values, at, array[new_order])
+            nbytes += index.order.nbytes + index.sorted_values.nbytes - self.order.nbytes - self.sorted_values.nbytes
+        index.nbytes = nbytes
+        return index
+
+    def lookup(self, value):
+        rows = self.positions.get(value)
+        if rows is None and isinstance(value, str):
+            # Values typed as text (e.g. from JSON or astype(str) options)
+            if self._text_positions is None:
+                self._text_positions = {str(key): rows for key, rows in self.positions.items()}
+            rows = self._text_positions.get(value)
+        return rows
+
+    def range_positions(self, min_val, max_val):
+        dates = self.sorted_values.dtype.kind == "i"
+        start = np.searchsorted(self.sorted_values, range_key(min_val, dates), side="left")
+        stop = np.searchsorted(self.sorted_values, range_key(max_val, dates), side="right")
+        return self.order[start:stop]
+
+
+class Dataset:
+    def __init__(self, source, skip_first_row, frame):
+        self.source = source
+        self.skip_first_row = skip_first_row
+        self.frame = frame
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update("\x1f".join(str(column) for column in frame.columns).encode("utf-8"))
+        digest.update(self.row_hashes.tobytes())
+        self.version = digest.hexdigest()
+        self._indexes = {}
+        self._stats = None
+        self._unique_counts = None
+        self._options = {}
+        self._frame_bytes = None
+        # Text columns looked at by engine.coerce_types when it was loaded
+        self.coercions = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.frame.shape[0]
+
+    # Value indexes are built lazily, one column at a time
+    def index(self, column):
+        column_index = self._indexes.get(column)
+        if column_index is None:
+            with self._lock:
+                column_index = self._indexes.get(column)
+                if column_index is None:
+                    with metrics.span("build_index"):
+                        column_index = ColumnIndex(self.frame[column])
+                    self._indexes[column] = column_index
+        return column_index
+
+    def build_indexes(self):
+        for column in self.frame.columns:
+            self.index(column)
+
+    # Row positions matching the filters (same semantics as engine.apply_filters).
+    # Results are shared across sessions through the result cache.
+    def filter_positions(self, filters):
+        signature = engine.filter_signature(filters)
+        if signature == "{}":
+            return np.arange(len(self))
+        key = (self.version, signature)
+        positions = result_cache.RESULTS.get(key)
+        if positions is None:
+            positions = backends.filter_positions(self, filters)
+            result_cache.RESULTS.put(key, positions)
+            enforce_budget(protect=self)
+        return positions
+
+    # Filter with the value indexes built above (the pandas backend)
+    def index_positions(self, filters):
+        mask = None
+        for column, values in filters.items():
+            if not isinstance(values, tuple) and not values:
+                continue
+            column_index = self.index(column)
+            if isinstance(values, tuple):
+                rows = column_index.range_positions(*values)
+            else:
+                matches = [rows for rows in map(column_index.lookup, values) if rows is not None]
+                rows = np.concatenate(matches) if matches else np.empty(0, dtype=np.intp)
+            column_mask = np.zeros(len(self), dtype=bool)
+            column_mask[rows] = True
+            mask = column_mask if mask is None else mask & column_mask
+        if mask is None:
+            return np.arange(len(self))
+        return np.flatnonzero(mask)
+
+    # Intended pick weights of the rows at `positions`, from `column`
+    def pick_weights(self, positions, column, prefer="higher"):
+        values = pd.to_numeric(self.frame[column].iloc[positions], errors="coerce")
+        return sampling.preference_weights(values.to_numpy(dtype="float64", na_value=np.nan), prefer)
+
+    # Alias table for weighted picks among the rows matching the filters;
+    # built once per (filters, weight column, preference) and shared
+    def alias_table(self, filters, column, prefer="higher"):
+        key = (self.version, engine.filter_signature(filters), "alias", column, prefer)
+        table = result_cache.RESULTS.get(key)
+        if table is None:
+            positions = self.filter_positions(filters)
+            with metrics.span("build_alias"):
+                table = sampling.AliasTable(self.pick_weights(positions, column, prefer))
+            result_cache.RESULTS.put(key, table)
+            enforce_budget(protect=self)
+        return table
+
+    def filter(self, filters):
+        return self.frame.iloc[self.filter_positions(filters)]
+
+    # The rows at `positions` as sent to a results table: only the shown
+    # columns, long text cut short, converted to Arrow once per row set.
+    # `row_key` names the row set (e.g. a filter signature); None skips the
+    # cache for one-off row sets such as random picks.
+    def display_table(self, positions, columns, max_chars, row_key=None):
+        key = (self.version, row_key, "display", tuple(columns), max_chars)
+        table = result_cache.RESULTS.get(key) if row_key is not None else None
+        if table is None:
+            with metrics.span("to_arrow"):
+                frame = engine.truncate_text(self.frame.iloc[positions][list(columns)], max_chars)
+                if engine.pa is None:
+                    return frame
+                table = engine.pa.Table.from_pandas(frame, preserve_index=True)
+            if row_key is not None:
+                result_cache.RESULTS.put(key, table)
+        return table
+
+    # Distinct values per column, counted once per snapshot (columns carried
+    # over from the previous snapshot by a refresh are not counted again)
+    def unique_counts(self):
+        counts = self._unique_counts
+        if counts is None or len(counts) < self.frame.shape[1]:
+            counts = counts or {}
+            with metrics.span("profile"):
+                counts = {column: counts[column] if column in counts else self.frame[column].nunique()
+                          for column in self.frame.columns}
+            self._unique_counts = counts
+        return counts
+
+    # Column groups for the filter widgets (see engine.classify_columns)
+    def profile(self, max_unique_values):
+        return engine.classify_columns(self.frame, max_unique_values, unique_counts=self.unique_counts())
+
+    # Sorted filter options for one column, computed the first time a
+    # filter for it is shown and kept for the snapshot
+    def filter_options(self, column, limit=None, as_text=False):
+        options = self._options.get((column, as_text))
+        if options is None:
+            with metrics.span("filter_options"):
+                options = engine.filter_options(self.frame, column, as_text=as_text)
+            self._options[(column, as_text)] = options
+        return options[:limit] if limit is not None else options
+
+    # Non-null counts and numeric means; computed once per snapshot
+    def column_stats(self):
+        if self._stats is None:
+            self._stats = backends.column_stats(self)
+        return self._stats
+
+    # Carry what `previous` (the last snapshot of the same source) derived
+    # over to this one when the refresh appended rows, edited a few in place
+    # or cut rows off the end: indexes, distinct counts, filter options and
+    # stats are updated from the changed rows only. Returns the number of
+    # changed rows, or None when everything has to be rebuilt.
+    def inherit(self, previous):
+        change = diff_rows(previous, self)
+        if change is None:
+            return None
+        removed, added = change
+        before = previous.frame.iloc[removed]
+        after = self.frame.iloc[added]
+        with metrics.span("refresh_indexes"):
+            for column, column_index in list(previous._indexes.items()):
+                self._indexes[column] = column_index.updated(before[column], removed, after[column], added)
+        if previous._unique_counts is not None:
+            # Counts come from the updated indexes; other columns are counted
+            # again if asked for
+            self._unique_counts = {column: len(self._indexes[column].positions)
+                                   for column in self.frame.columns if column in self._indexes}
+        for (column, as_text), options in list(previous._options.items()):
+            if not len(removed):
+                # Append-only: existing values stay, new ones are merged in
+                fresh = engine.filter_options(after, column, as_text=as_text)
+                self._options[(column, as_text)] = sorted(set(options).union(fresh))
+        if previous._stats is not None:
+            self._stats = _updated_stats(previous._stats, before, after)
+        return len(np.union1d(removed, added))
+
+    # Bytes held for this snapshot: the frame (measured once, it never
+    # changes), row hashes and whatever indexes have been built so far
+    def memory_usage(self):
+        if self._frame_bytes is None:
+            self._frame_bytes = memory.object_bytes(self.frame)
+        return {
+            "frame": self._frame_bytes,
+            "hashes": self.row_hashes.nbytes,
+            "indexes": sum(column_index.nbytes for column_index in list(self._indexes.values())),
+        }
+
+    def nbytes(self):
+        return sum(self.memory_usage().values())
+
+
+# Refreshes changing more than this share of the rows rebuild from scratch
+MAX_CHANGED_FRACTION = 0.1
+
+
+# Rows that differ between two snapshots of a source, as (positions whose
+# old values went away, positions with new values); None when the columns
+# changed or rows were inserted or deleted mid-sheet (positions shift).
+def diff_rows(old, new):
+    if list(old.frame.columns) != list(new.frame.columns) or not old.frame.dtypes.equals(new.frame.dtypes):
+        return None
+    common = min(len(old), len(new))
+    edited = np.flatnonzero(old.row_hashes[:common] != new.row_hashes[:common])
+    changed = len(edited) + abs(len(new) - len(old))
+    if changed > MAX_CHANGED_FRACTION * max(len(new), 1):
+        return None
+    removed = np.concatenate([edited, np.arange(common, len(old))])
+    added = np.concatenate([edited, np.arange(common, len(new))])
+    return removed, added
+
+
+# Non-null counts and means after replacing the `before` rows with `after`
+def _updated_stats(stats, before, after):
+    counts, means = stats
+    new_counts = counts - before.count() + after.count()
+    if means is None:
+        return new_counts.astype("int64"), None
+    columns = means.index
+    sums = (means * counts[columns]).fillna(0.0) - before[columns].sum() + after[columns].sum()
+    new_means = (sums / new_counts[columns].where(new_counts[columns] > 0)).astype("float64")
+    return new_counts.astype("int64"), new_means
+
+
+_datasets = {}
+_loading_locks = {}
+_store_lock = threading.Lock()
+_evictions = {"count": 0, "bytes": 0}
+
+
+# Get the cached dataset for a source, loading it at most once per TTL even
+# when many sessions or requests ask for it at the same time. `loader` reads
+# sources that aren't a URL or path (e.g. uploaded files).
+def get_dataset(source, skip_first_row=True, ttl=None, loader=None):
+    ttl = settings.DATASET_TTL if ttl is None else ttl
+    key = (source, skip_first_row)
+    entry = _datasets.get(key)
+    if entry is not None and time.time() - entry.loaded_at < ttl:
+        entry.last_used = time.time()
+        return entry
+
+    with _store_lock:
+        lock = _loading_locks.setdefault(key, threading.Lock())
+    with lock:
+        entry = _datasets.get(key)
+        if entry is not None and time.time() - entry.loaded_at < ttl:
+            return entry
+        frame = loader() if loader is not None else engine.load_source(source, skip_first_row)
+        # Kept on the dataset instead; pandas would copy attrs into every
+        # frame derived from this one
+        coercions = frame.attrs.pop("coercions", [])
+        entry = Dataset(source, skip_first_row, frame)
+        entry.coercions = coercions
+        old = _datasets.get(key)
+        if old is not None:
+            changed = entry.inherit(old)
+            if changed is not None:
+                logger.info("Refreshed %s: %d of %d rows changed, reused the previous profile and indexes",
+                            source, changed, len(entry))
+        _datasets[key] = entry
+    if old is not None:
+        # The expired snapshot's results can never be hit again
+        result_cache.RESULTS.drop_version(old.version)
+    enforce_budget(protect=entry)
+    return entry
+
+
+def cached_datasets():
+    return list(_datasets.values())
+
+
+def evict(dataset):
+    key = (dataset.source, dataset.skip_first_row)
+    if _datasets.get(key) is dataset:
+        del _datasets[key]
+    result_cache.RESULTS.drop_version(dataset.version)
+
+
+# Sources of uploaded files; an upload is only ever used by the session that
+# uploaded it, so its snapshot can go as soon as that session moves on
+UPLOAD_PREFIX = "upload:"
+
+
+def upload_source(file_id, name):
+    return f"{UPLOAD_PREFIX}{file_id}/{name}"
+
+
+# Drop a source's cached snapshot, if any (e.g. an upload that was replaced)
+def discard(source, skip_first_row=True):
+    dataset = _datasets.get((source, skip_first_row))
+    if dataset is not None:
+        evict(dataset)
+
+
+# Drop uploads nobody has used for `idle` seconds (default FOOD_DATASET_TTL):
+# their sessions have most likely closed. Returns how many were dropped.
+def evict_idle_uploads(idle=None):
+    idle = settings.DATASET_TTL if idle is None else idle
+    now = time.time()
+    stale = [dataset for dataset in cached_datasets()
+             if str(dataset.source).startswith(UPLOAD_PREFIX) and now - dataset.last_used > idle]
+    for dataset in stale:
+        evict(dataset)
+        logger.info("Dropped upload %s, idle for %.0fs", dataset.source, now - dataset.last_used)
+    return len(stale)
+
+
+# Bytes the process keeps between reruns, as accounted for here
+def accounted_bytes():
+    return (sum(dataset.nbytes() for dataset in cached_datasets()) + result_cache.RESULTS.memory_bytes()
+            + memory.session_bytes())
+
+
+# Bring the accounted memory under FOOD_MEMORY_BUDGET_MB. Cheapest first:
+# move cold cached results to disk (or drop them), then evict the least
+# recently used datasets; `protect` (the dataset being served) stays.
+def enforce_budget(protect=None):
+    budget = memory.budget_bytes()
+    if budget <= 0:
+        return 0
+    over = accounted_bytes() - budget
+    if over <= 0:
+        return 0
+    freed = result_cache.RESULTS.release(over)
+    for dataset in sorted(cached_datasets(), key=lambda dataset: dataset.last_used):
+        if freed >= over:
+            break
+        if dataset is protect:
+            continue
+        nbytes = dataset.nbytes()
+        evict(dataset)
+        freed += nbytes
+        _evictions["count"] += 1
+        _evictions["bytes"] += nbytes
+        logger.info("Evicted %s (%.1f MB, idle %.0fs) to stay within the memory budget",
+                    dataset.source, nbytes / memory.MB, time.time() - dataset.last_used)
+    if freed < over:
+        logger.warning("Memory budget exceeded by %.1f MB with nothing left to evict", (over - freed) / memory.MB)
+    return freed
+
+
+def clear():
+    _datasets.clear()
+
+
+def _gauges():
+    entries = cached_datasets()
+    return {
+        "count": len(entries),
+        "bytes": sum(dataset.nbytes() for dataset in entries),
+        "evictions": _evictions["count"],
+        "evicted_bytes": _evictions["bytes"],
+    }
+
+
+metrics.register_gauges("datasets", _gauges)
@@ -0,0 +1,575 @@
+import base64
+import datetime
+import json
+import math
+import os
+import random
+import tempfile
+import urllib.parse
+import urllib.request
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import coercion
+import memory
+import metrics
+import settings
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    from pyarrow import parquet as pa_parquet
+except ImportError:
+    pa = None
+
+logger = metrics.get_logger(__name__)
+
+# UI-free core of the viewer: loading, column classification, filtering,
+# random selection and export. Both Streamlit apps and the batch CLI use it.
+
+# Columns with at most this many unique values get a simple multiselect
+FEW_UNIQUE_VALUES = 20
+
+
+# Get sheet ID from a Google Sheet URL
+def parse_sheet_id(sheet_url):
+    if "spreadsheets/d/" not in sheet_url:
+        raise ValueError("Invalid Google Sheet URL")
+    return sheet_url.split("spreadsheets/d/")[1].split("/")[0]
+
+
+# For public sheets, we can use the export CSV link directly
+def csv_export_url(sheet_id):
+    return f"{settings.SHEETS_BASE_URL}/spreadsheets/d/{sheet_id}/export?format=csv"
+
+
+# Visualization query endpoint; runs `query` on the sheet and returns CSV
+def gviz_query_url(sheet_id, query, skip_first_row=True):
+    params = {"tqx": "out:csv", "tq": query, "headers": "1"}
+    if skip_first_row:
+        # Start the table at row 2 so that row becomes the header
+        params["range"] = "A2:ZZZ"
+    return f"{settings.SHEETS_BASE_URL}/spreadsheets/d/{sheet_id}/gviz/tq?{urllib.parse.urlencode(params)}"
+
+
+def fetch_csv(url):
+    with metrics.span("fetch") as span:
+        with urllib.request.urlopen(url) as response:
+            raw = response.read()
+        span.add_bytes(len(raw))
+    return raw
+
+
+# Column types the first Arrow parse of a source inferred, reused on reloads
+# so later parses skip type inference. Columns inferred as text are not
+# pinned: one stray cell can make a numeric column text, and once the sheet
+# is fixed the next load should read numbers again, as pd.read_csv would.
+_arrow_column_types = {}
+
+
+def _pandas_compatible_type(data_type):
+    # Keep the dtypes pd.read_csv would give: dates and times stay text,
+    # all-empty columns become float NaN
+    if pa.types.is_null(data_type):
+        return pa.float64()
+    if pa.types.is_temporal(data_type):
+        return pa.string()
+    return data_type
+
+
+def _read_csv_arrow(source, skip_first_row, types_key):
+    read_options = pa_csv.ReadOptions(use_threads=True, skip_rows=1 if skip_first_row else 0)
+
+    def parse(column_types):
+        convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, column_types=column_types)
+        return pa_csv.read_csv(source, read_options=read_options, convert_options=convert_options)
+
+    pinned = (_arrow_column_types.get(types_key) if types_key is not None else None) or {}
+    table = parse(pinned)
+    names = table.column_names
+    if "" in names or len(set(names)) != len(names):
+        # pandas names these "Unnamed: N" / "X.1"; let it handle them
+        raise ValueError("blank or duplicate column names")
+    parsed = dict(zip(names, table.schema.types))
+    column_types = {name: _pandas_compatible_type(data_type) for name, data_type in parsed.items()}
+    if column_types != parsed:
+        # First load, or an unpinned column now reads as dates
+        source.seek(0)
+        table = parse(column_types)
+    if types_key is not None:
+        # Dates kept as text stay pinned (they were pinned, or parsed as
+        # dates just now); text Arrow inferred itself is inferred again
+        _arrow_column_types[types_key] = {
+            name: data_type for name, data_type in column_types.items()
+            if not pa.types.is_string(data_type) or name in pinned or pa.types.is_temporal(parsed[name])
+        }
+    # split_blocks avoids consolidating columns into 2D blocks, so numeric
+    # columns without nulls are handed to pandas without a copy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_csv(raw, skip_first_row=True, types_key=None):
+    with metrics.span("parse"):
+        source = BytesIO(raw) if isinstance(raw, bytes) else raw
+        if settings.CSV_PARSER == "arrow" and pa is not None:
+            try:
+                return _read_csv_arrow(source, skip_first_row, types_key)
+            except (pa.ArrowInvalid, ValueError):
+                # Ragged rows, a value that no longer fits the remembered
+                # type, odd headers: forget the types, parse with pandas
+                _arrow_column_types.pop(types_key, None)
+                source.seek(0)
+        if skip_first_row:
+            # Skip the first row (row 1) and use the second row (row 2) as header
+            return pd.read_csv(source, skiprows=1)
+        # Use the first row as header (default behavior)
+        return pd.read_csv(source)
+
+
+# Last step of every load: text columns holding formatted numbers or dates
+# become numeric and datetime columns (FOOD_COERCE_TYPES), so the app, the
+# pick service and the CLI all filter the same dtypes. What was looked at is
+# reported in frame.attrs["coercions"] (see coercion.coerce_frame).
+def coerce_types(frame):
+    if not settings.COERCE_TYPES:
+        return frame
+    with metrics.span("coerce"):
+        frame, report = coercion.coerce_frame(frame)
+    frame.attrs["coercions"] = report
+    return frame
+
+
+def load_sheet(sheet_url, skip_first_row=True):
+    sheet_id = parse_sheet_id(sheet_url)
+    return coerce_types(read_csv(fetch_csv(csv_export_url(sheet_id)), skip_first_row, types_key=sheet_id))
+
+
+def is_sheet_url(source):
+    return str(source).startswith(("http://", "https://"))
+
+
+# "csv", "excel" or "parquet", from a file name
+def file_format(name):
+    suffix = Path(str(name)).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    if suffix in (".xlsx", ".xlsm", ".xls"):
+        # openpyxl reads .xlsx/.xlsm, xlrd the old .xls format
+        return "excel"
+    return "csv"
+
+
+# Read a local CSV, XLSX or Parquet file: a path, or a binary file object
+# such as an upload (`name` gives the format). Paths are memory-mapped, so a
+# large snapshot is parsed straight from the page cache instead of being
+# copied into Python first. Parquet has real column names and no title row,
+# so skip_first_row only applies to CSV and XLSX.
+def read_file(source, name=None, skip_first_row=True):
+    return coerce_types(_read_file(source, name, skip_first_row))
+
+
+def _read_file(source, name, skip_first_row):
+    fmt = file_format(name or source)
+    is_path = isinstance(source, (str, Path))
+    if is_path:
+        with metrics.span("fetch") as span:
+            span.add_bytes(os.path.getsize(source))
+    else:
+        # The same upload is read again when its snapshot expires
+        source.seek(0)
+    if fmt == "csv":
+        if not is_path:
+            return read_csv(source, skip_first_row)
+        types_key = str(Path(source).resolve())
+        if settings.CSV_PARSER == "arrow" and pa is not None:
+            with pa.memory_map(str(source)) as mapped:
+                return read_csv(mapped, skip_first_row, types_key=types_key)
+        with open(source, "rb") as f:
+            return read_csv(f, skip_first_row, types_key=types_key)
+    with metrics.span("parse"):
+        if fmt == "parquet":
+            if pa is None:
+                return pd.read_parquet(source)
+            table = pa_parquet.read_table(source, memory_map=is_path)
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        # pandas reads XLSX with openpyxl in read-only (streaming) mode
+        return pd.read_excel(source, skiprows=1 if skip_first_row else 0)
+
+
+# A snapshot path typed by a visitor, resolved inside FOOD_SNAPSHOT_DIR.
+# Anything outside it, or not a data file, raises ValueError.
+SNAPSHOT_SUFFIXES = (".csv", ".xlsx", ".xlsm", ".xls", ".parquet", ".pq")
+
+
+def snapshot_path(name):
+    if not settings.SNAPSHOT_DIR:
+        raise ValueError("Only Google Sheet URLs can be opened here (set FOOD_SNAPSHOT_DIR to allow local files)")
+    root = Path(settings.SNAPSHOT_DIR).resolve()
+    path = (root / name).resolve()
+    if not path.is_relative_to(root) or path.suffix.lower() not in SNAPSHOT_SUFFIXES:
+        raise ValueError(f"Not a CSV, Excel or Parquet file in the snapshot folder: {name}")
+    return str(path)
+
+
+# Load a Google Sheet URL or a local CSV/XLSX/Parquet snapshot
+def load_source(source, skip_first_row=True):
+    if is_sheet_url(source):
+        return load_sheet(source, skip_first_row)
+    return read_file(source, skip_first_row=skip_first_row)
+
+
+# Column IDs used by the query language: A, B, ..., Z, AA, AB, ...
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+# Query language literal for a filter value, or None if it can't be written
+def gviz_literal(value):
+    value = canonical_value(value)
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return repr(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        # There is no escaping, so a value can't contain both quote kinds
+        if "'" not in value:
+            return f"'{value}'"
+        if '"' not in value:
+            return f'"{value}"'
+    return None
+
+
+# Translate filters (and an optional column projection) into a query.
+# Returns the query and the filters that could not be pushed down.
+def build_gviz_query(filters, header, columns=None):
+    letters = {name: column_letter(i) for i, name in enumerate(header)}
+    conditions = []
+    local_filters = {}
+    for column, values in filters.items():
+        letter = letters.get(column)
+        if letter is None:
+            local_filters[column] = values
+        elif isinstance(values, tuple):
+            literals = [gviz_literal(value) for value in values if not is_open_bound(value)]
+            if None in literals:
+                # Date bounds: the endpoint may type the column as text
+                local_filters[column] = values
+                continue
+            bounds = []
+            if not is_open_bound(values[0]):
+                bounds.append(f"{letter} >= {gviz_literal(values[0])}")
+            if not is_open_bound(values[1]):
+                bounds.append(f"{letter} <= {gviz_literal(values[1])}")
+            if bounds:
+                conditions.append(" and ".join(bounds))
+        elif values:
+            literals = [gviz_literal(value) for value in values]
+            if None in literals:
+                local_filters[column] = values
+            else:
+                conditions.append("(" + " or ".join(f"{letter} = {literal}" for literal in literals) + ")")
+
+    if columns:
+        # Filter columns are kept so the result can be re-checked locally
+        wanted = set(columns) | set(filters)
+        select = ", ".join(letters[name] for name in header if name in wanted)
+    else:
+        select = "*"
+    query = f"select {select}"
+    if conditions:
+        query += " where " + " and ".join(conditions)
+    return query, local_filters
+
+
+# Fetch only the rows (and columns) matching the filters by pushing them down
+# to the sheet's query endpoint. Filters that can't be expressed are applied
+# locally; if the query can't be fetched or read, the whole sheet is
+# downloaded instead. Returns the rows and whether the pushdown was used.
+# The endpoint types each column by its majority type and blanks other
+# cells, so this mode suits tidy sheets and stays opt-in.
+def load_sheet_pushdown(sheet_url, skip_first_row=True, filters=None, columns=None):
+    filters = filters or {}
+    sheet_id = parse_sheet_id(sheet_url)
+    pushed_down = True
+    try:
+        header_raw = fetch_csv(gviz_query_url(sheet_id, "select * limit 0", skip_first_row))
+        header = list(pd.read_csv(BytesIO(header_raw), nrows=0).columns)
+        query, _ = build_gviz_query(filters, header, columns)
+        with metrics.span("pushdown"):
+            data = coerce_types(read_csv(fetch_csv(gviz_query_url(sheet_id, query, skip_first_row)), skip_first_row=False))
+    except (OSError, ValueError) as e:
+        # Network and HTTP errors are OSErrors; pandas and Arrow parse
+        # errors are ValueErrors
+        logger.warning("Pushdown query for sheet %s failed, downloading the whole sheet: %s", sheet_id, e)
+        pushed_down = False
+        data = load_sheet(sheet_url, skip_first_row)
+    # Re-check every filter locally; cheap on the reduced result and keeps the
+    # semantics identical to apply_filters
+    data = apply_filters(data, filters)
+    if columns:
+        data = data[[column for column in columns if column in data.columns]]
+    return data, pushed_down
+
+
+# Numbers and dates get range filters
+def is_range_dtype(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)
+
+
+# Phân loại các cột theo loại dữ liệu và số lượng giá trị duy nhất
+def classify_columns(data, max_unique_values, detect_numeric=True, unique_counts=None):
+    groups = {
+        "few": [],       # <= 20 giá trị duy nhất
+        "many": [],      # > 20 nhưng <= max_unique_values
+        "too_many": [],  # > max_unique_values
+        "numeric": [],
+    }
+    for column in data.columns:
+        unique_count = unique_counts[column] if unique_counts is not None else data[column].nunique()
+        if detect_numeric and is_range_dtype(data[column].dtype) and unique_count > 1:
+            groups["numeric"].append((column, unique_count))
+        elif unique_count <= FEW_UNIQUE_VALUES:
+            groups["few"].append((column, unique_count))
+        elif unique_count <= max_unique_values:
+            groups["many"].append((column, unique_count))
+        else:
+            groups["too_many"].append((column, unique_count))
+    return groups
+
+
+# Text cells longer than `max_chars` cut short for display; exports and
+# filters keep the full text
+def truncate_text(frame, max_chars):
+    if not max_chars:
+        return frame
+    frame = frame.copy(deep=False)
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            text = values.astype(str).where(values.notna())
+            long = (text.str.len() > max_chars).fillna(False).astype(bool)
+            if long.any():
+                frame[column] = text.where(~long, text.str.slice(0, max_chars - 1) + "…")
+    return frame
+
+
+# Sorted values to offer in a multiselect filter
+def filter_options(data, column, limit=None, as_text=False):
+    values = data[column].astype(str) if as_text else data[column]
+    options = sorted(values.dropna().unique())
+    return options[:limit] if limit is not None else options
+
+
+# Bounds of a range filter: floats, or Timestamps for date columns
+def numeric_range(data, column):
+    if pd.api.types.is_datetime64_any_dtype(data[column].dtype):
+        return data[column].min(), data[column].max()
+    return float(data[column].min()), float(data[column].max())
+
+
+# A range bound from a JSON spec: a number, or a date string like "2024-05-31"
+def range_bound(value, default):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return pd.Timestamp(value)
+    return float(value)
+
+
+# The missing side of an open range (range_bound's -inf / inf default), which
+# can't be compared with dates
+def is_open_bound(value):
+    return isinstance(value, float) and math.isinf(value)
+
+
+# Turn a JSON filter spec into the filters used by apply_filters:
+# {"Type": ["Noodles", "Rice"], "Price": {"min": 0, "max": 50000}}
+# (the canonical form, {"Type": {"in": [...]}}, is read too)
+def normalize_filters(spec):
+    filters = {}
+    for column, value in spec.items():
+        if isinstance(value, dict) and "in" in value:
+            filters[column] = list(value["in"])
+        elif isinstance(value, dict):
+            filters[column] = (range_bound(value.get("min"), -math.inf), range_bound(value.get("max"), math.inf))
+        elif isinstance(value, (list, tuple)):
+            filters[column] = list(value)
+        else:
+            filters[column] = [value]
+    return filters
+
+
+# Apply filters to the data. A list keeps rows whose value is in the list,
+# a (min, max) tuple keeps rows inside the inclusive range.
+def apply_filters(data, filters):
+    mask = np.ones(len(data), dtype=bool)
+    for column, values in filters.items():
+        if isinstance(values, tuple):
+            min_val, max_val = values
+            # Missing values never match a range, open or not
+            inside = data[column].notna()
+            if not is_open_bound(min_val):
+                inside &= data[column] >= min_val
+            if not is_open_bound(max_val):
+                inside &= data[column] <= max_val
+            mask &= inside.to_numpy()
+        elif values:
+            mask &= data[column].isin(values).to_numpy()
+    return data[mask]
+
+
+def canonical_value(value):
+    # numpy scalars -> plain Python values so equal filters compare equal
+    return value.item() if hasattr(value, "item") else value
+
+
+# Dates as ISO strings (what range_bound reads back), anything else as float
+def canonical_bound(value):
+    if isinstance(value, (pd.Timestamp, datetime.date, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    return float(value)
+
+
+# Canonical, order-independent form of a filter set; no-op filters are dropped
+def canonical_filters(filters):
+    canonical = {}
+    for column, values in filters.items():
+        if isinstance(values, tuple):
+            canonical[str(column)] = {"min": canonical_bound(values[0]), "max": canonical_bound(values[1])}
+        elif values:
+            unique = {canonical_value(v) for v in values}
+            canonical[str(column)] = {"in": sorted(unique, key=lambda v: (type(v).__name__, repr(v)))}
+    return canonical
+
+
+# Stable string identifying a filter set, e.g. for caching its result
+def filter_signature(filters):
+    return json.dumps(canonical_filters(filters), sort_keys=True, separators=(",", ":"),
+                      ensure_ascii=False, default=str)
+
+
+# Longest filter set a token may expand to, so a crafted link can't make the
+# server inflate a huge payload
+MAX_TOKEN_SPEC_BYTES = 64 * 1024
+
+
+# Compact, URL-safe token for a filter set (e.g. for a shareable link): the
+# canonical signature, deflated and base64url-encoded without padding.
+# Equal filter sets give equal tokens; no filters give "".
+def filter_token(filters):
+    signature = filter_signature(filters)
+    if signature == "{}":
+        return ""
+    # Raw deflate: no zlib header or checksum, which matter at this size
+    deflater = zlib.compressobj(9, zlib.DEFLATED, -15)
+    data = deflater.compress(signature.encode("utf-8")) + deflater.flush()
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+# Filters back from a token made by filter_token; ValueError if it is not one
+def parse_filter_token(token):
+    if not token:
+        return {}
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        inflater = zlib.decompressobj(-15)
+        text = inflater.decompress(data, MAX_TOKEN_SPEC_BYTES)
+        if inflater.unconsumed_tail:
+            raise ValueError("filter token is too large")
+        spec = json.loads(text.decode("utf-8"))
+        if not isinstance(spec, dict):
+            raise ValueError("filter token is not a filter set")
+        return normalize_filters(spec)
+    except (zlib.error, UnicodeDecodeError, TypeError, AttributeError) as e:
+        raise ValueError(f"invalid filter token: {e}")
+
+
+# Date bounds as days when they fall on day boundaries (a day-granular
+# range ends at 23:59:59.999999999)
+def describe_bound(value):
+    if not isinstance(value, pd.Timestamp):
+        return value
+    if value == value.normalize() or (value + pd.Timedelta(1, "ns")) == (value + pd.Timedelta(1, "ns")).normalize():
+        return value.date().isoformat()
+    return value.strftime("%Y-%m-%d %H:%M")
+
+
+def describe_filters(filters):
+    active_filters = []
+    for column, values in filters.items():
+        if isinstance(values, tuple):
+            active_filters.append(f"{column}: {describe_bound(values[0])} to {describe_bound(values[1])}")
+        elif values:
+            active_filters.append(f"{column}: {', '.join(str(v) for v in values)}")
+    return active_filters
+
+
+# Randomly choose `count` of `total` row positions; all of them when there are fewer
+def sample_positions(total, count, rng=random):
+    if total <= count:
+        return list(range(total))
+    return rng.sample(range(total), count)
+
+
+# Randomly select up to `count` rows; all rows when there are fewer
+def sample_rows(data, count, rng=random):
+    if data.shape[0] <= count:
+        return data
+    return data.iloc[sample_positions(data.shape[0], count, rng)]
+
+
+def column_stats(data):
+    non_null_counts = data.count()
+    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+    mean_values = data[numeric_cols].mean() if numeric_cols else None
+    return non_null_counts, mean_values
+
+
+def to_csv_bytes(df):
+    return df.to_csv(index=False).encode()
+
+
+def to_excel_bytes(df):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Sheet1")
+    return output.getvalue()
+
+
+# Base64 of a CSV/XLSX export for a download link. The file is written to a
+# spooled temporary file, which moves to disk past FOOD_SPILL_THRESHOLD_MB,
+# and encoded a chunk at a time, so a big export is never held twice over.
+def export_base64(df, excel=False, chunk_size=3 * 1024 * 1024):
+    threshold = memory.spill_threshold_bytes()
+    with tempfile.SpooledTemporaryFile(max_size=threshold, dir=settings.SPILL_DIR) as spool:
+        if excel:
+            with pd.ExcelWriter(spool, engine="xlsxwriter") as writer:
+                df.to_excel(writer, index=False, sheet_name="Sheet1")
+        else:
+            df.to_csv(spool, index=False, encoding="utf-8", chunksize=10000)
+        spool.seek(0)
+        # chunk_size is a multiple of 3, so the pieces join without padding
+        return "".join(base64.b64encode(chunk).decode() for chunk in iter(lambda: spool.read(chunk_size), b""))
+
+
+def export(df, path):
+    path = Path(path)
+    if path.suffix.lower() == ".xlsx":
+        path.write_bytes(to_excel_bytes(df))
+    elif file_format(path) == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        path.write_bytes(to_csv_bytes(df))
+    return path
@@ -0,0 +1,115 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import settings
+
+# Memory accounting for what the process keeps between reruns: session state
+# and export artifacts per session (cached datasets and results account for
+# themselves, see datasets.py and result_cache.py).
+
+MB = 1024 * 1024
+
+_sessions = {}
+_exports = {"count": 0, "bytes": 0}
+_lock = threading.Lock()
+
+
+def budget_bytes():
+    return int(settings.MEMORY_BUDGET_MB * MB)
+
+
+def spill_threshold_bytes():
+    return int(settings.SPILL_THRESHOLD_MB * MB)
+
+
+# Approximate bytes held by an object: exact for arrays and frames, shallow
+# sizes for everything else. Memory-mapped arrays live on disk and count 0.
+def object_bytes(obj, depth=0):
+    if isinstance(obj, np.memmap):
+        return 0
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(obj, pd.DataFrame) else usage)
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(obj)
+    if depth < 3:
+        if isinstance(obj, dict):
+            size += sum(object_bytes(key, depth + 1) + object_bytes(value, depth + 1) for key, value in obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            size += sum(object_bytes(item, depth + 1) for item in obj)
+    return size
+
+
+def _session_name():
+    recorder = metrics.current_session()
+    return recorder.name if recorder is not None else None
+
+
+# Store the size of a session's state; called once per rerun
+def record_session(name, state):
+    state_bytes = sum(object_bytes(value) for value in state.values())
+    with _lock:
+        entry = _sessions.setdefault(name, {"state_bytes": 0, "export_bytes": 0, "exports": 0})
+        entry["state_bytes"] = state_bytes
+        entry["updated"] = time.time()
+        # Sessions that have closed drop out with their timing recorder
+        live = set(metrics.session_names())
+        for stale in [session for session in _sessions if session not in live]:
+            del _sessions[stale]
+
+
+# Count an export artifact (e.g. a download link) against the current session.
+# Only the latest one is held by the page, so it replaces the previous one.
+def record_export(nbytes):
+    name = _session_name()
+    with _lock:
+        _exports["count"] += 1
+        _exports["bytes"] += nbytes
+        if name is not None:
+            entry = _sessions.setdefault(name, {"state_bytes": 0, "export_bytes": 0, "exports": 0})
+            entry["export_bytes"] = nbytes
+            entry["exports"] += 1
+
+
+def sessions():
+    with _lock:
+        return {name: dict(entry) for name, entry in _sessions.items()}
+
+
+def session_bytes():
+    with _lock:
+        return sum(entry["state_bytes"] + entry["export_bytes"] for entry in _sessions.values())
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _gauges():
+    with _lock:
+        return {
+            "sessions": len(_sessions),
+            "session_bytes": sum(entry["state_bytes"] + entry["export_bytes"] for entry in _sessions.values()),
+            "exports_total": _exports["count"],
+            "export_bytes_total": _exports["bytes"],
+            "budget_bytes": budget_bytes(),
+            "rss_bytes": rss_bytes(),
+        }
+
+
+metrics.register_gauges("memory", _gauges)
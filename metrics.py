@@ -0,0 +1,282 @@
+import json
+import logging
+import threading
+import time
+import uuid
+import weakref
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+
+# Logger for one of the app's modules. Nothing configures the root logger
+# under plain `streamlit run`, so these get their own handler and level
+# (FOOD_LOG_LEVEL) instead of relying on serve.py's basicConfig; they don't
+# propagate, so messages aren't printed twice when it is set.
+def get_logger(name):
+    log = logging.getLogger(name)
+    if _log_handler not in log.handlers:
+        log.addHandler(_log_handler)
+        log.setLevel(settings.LOG_LEVEL)
+        log.propagate = False
+    return log
+
+
+logger = get_logger(__name__)
+
+# Lightweight timing spans for each phase of a rerun (fetch, parse, filter,
+# render, ...). Every span is recorded twice: once for the whole process and
+# once for the session that is currently running the script.
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile, good enough for latency summaries
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[rank]
+
+
+class Recorder:
+    def __init__(self, name="process", max_samples=None):
+        self.name = name
+        self.measure_bytes = False
+        self._max_samples = max_samples or settings.METRICS_MAX_SAMPLES
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self._max_samples))
+        self._counts = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._bytes = defaultdict(int)
+
+    def record(self, phase, seconds, nbytes=0):
+        with self._lock:
+            self._samples[phase].append(seconds)
+            self._counts[phase] += 1
+            self._seconds[phase] += seconds
+            self._bytes[phase] += nbytes
+
+    def summary(self):
+        with self._lock:
+            phases = {phase: sorted(samples) for phase, samples in self._samples.items()}
+            counts = dict(self._counts)
+            seconds = dict(self._seconds)
+            nbytes = dict(self._bytes)
+
+        rows = []
+        for phase, samples in phases.items():
+            rows.append({
+                "phase": phase,
+                "count": counts[phase],
+                "p50_ms": round(_percentile(samples, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(samples, 0.95) * 1000, 3),
+                "total_ms": round(seconds[phase] * 1000, 3),
+                "bytes": nbytes[phase],
+            })
+        return sorted(rows, key=lambda row: row["phase"])
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._seconds.clear()
+            self._bytes.clear()
+
+
+PROCESS = Recorder()
+
+# Live session recorders, so the metrics endpoint can report per session.
+# Entries disappear when the session state holding the recorder goes away.
+_sessions = weakref.WeakValueDictionary()
+_current_session = ContextVar("food_chooser_session_recorder", default=None)
+
+
+def new_session_recorder():
+    recorder = Recorder(name=uuid.uuid4().hex[:8])
+    _sessions[recorder.name] = recorder
+    return recorder
+
+
+# Make spans opened on this thread also count towards the given session
+def bind_session(recorder):
+    _current_session.set(recorder)
+
+
+def current_session():
+    return _current_session.get()
+
+
+# Names of the sessions that are still open
+def session_names():
+    return list(_sessions.keys())
+
+
+# Estimate how many bytes an element payload takes on the wire
+def payload_size(obj):
+    if isinstance(obj, bytes):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    if hasattr(obj, "memory_usage") or hasattr(obj, "schema"):
+        # DataFrames (and Arrow tables) are sent to the frontend as Arrow IPC streams
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return int(obj.memory_usage(index=True, deep=True).sum())
+        table = obj if isinstance(obj, pa.Table) else pa.Table.from_pandas(obj)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().size
+    return 0
+
+
+class Span:
+    def __init__(self, phase, session=None):
+        self.phase = phase
+        self.session = session if session is not None else _current_session.get()
+        self.nbytes = 0
+        self._start = None
+
+    @property
+    def measure_bytes(self):
+        return PROCESS.measure_bytes or (self.session is not None and self.session.measure_bytes)
+
+    def start(self):
+        self._start = time.perf_counter()
+        return self
+
+    # Count bytes for this span; payload objects are only sized when
+    # someone is actually looking at the numbers
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+    def add_payload(self, obj):
+        if self.measure_bytes:
+            self.nbytes += payload_size(obj)
+
+    def stop(self):
+        if self._start is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._start
+        self._start = None
+        PROCESS.record(self.phase, elapsed, self.nbytes)
+        if self.session is not None:
+            self.session.record(self.phase, elapsed, self.nbytes)
+        return elapsed
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def span(phase, session=None):
+    return Span(phase, session)
+
+
+# Other components (caches, stores) can publish counters next to the timings
+_gauge_sources = {}
+
+
+def register_gauges(prefix, source):
+    _gauge_sources[prefix] = source
+
+
+def gauges():
+    return {prefix: source() for prefix, source in list(_gauge_sources.items())}
+
+
+def snapshot():
+    return {
+        "process": PROCESS.summary(),
+        "sessions": {name: recorder.summary() for name, recorder in list(_sessions.items())},
+        "gauges": gauges(),
+    }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Render the process-wide metrics in the Prometheus text exposition format
+def prometheus_text():
+    lines = [
+        "# HELP food_chooser_phase_seconds Latency of each rerun phase.",
+        "# TYPE food_chooser_phase_seconds summary",
+    ]
+    rows = PROCESS.summary()
+    for row in rows:
+        phase = _label(row["phase"])
+        lines.append(f'food_chooser_phase_seconds{{phase="{phase}",quantile="0.5"}} {row["p50_ms"] / 1000}')
+        lines.append(f'food_chooser_phase_seconds{{phase="{phase}",quantile="0.95"}} {row["p95_ms"] / 1000}')
+        lines.append(f'food_chooser_phase_seconds_sum{{phase="{phase}"}} {row["total_ms"] / 1000}')
+        lines.append(f'food_chooser_phase_seconds_count{{phase="{phase}"}} {row["count"]}')
+    lines.append("# HELP food_chooser_phase_bytes_total Bytes transferred by each rerun phase.")
+    lines.append("# TYPE food_chooser_phase_bytes_total counter")
+    for row in rows:
+        lines.append(f'food_chooser_phase_bytes_total{{phase="{_label(row["phase"])}"}} {row["bytes"]}')
+    lines.append("# HELP food_chooser_sessions Sessions with recorded metrics.")
+    lines.append("# TYPE food_chooser_sessions gauge")
+    lines.append(f"food_chooser_sessions {len(_sessions)}")
+    for prefix, values in gauges().items():
+        for name, value in values.items():
+            lines.append(f"# TYPE food_chooser_{prefix}_{name} gauge")
+            lines.append(f"food_chooser_{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body = prometheus_text().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the Streamlit console
+        pass
+
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+# Start the metrics endpoint once per process; later calls are no-ops
+def start_server(port=None, host=None):
+    global _server, _server_failed
+    port = settings.METRICS_PORT if port is None else port
+    host = host or settings.METRICS_HOST
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                # Another process already owns the port; keep the app running
+                logger.warning("Metrics endpoint disabled: %s", e)
+                _server_failed = True
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="food-chooser-metrics", daemon=True).start()
+            PROCESS.measure_bytes = True
+    return _server
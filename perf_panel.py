@@ -0,0 +1,87 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+import datasets
+import memory
+import metrics
+import result_cache
+import settings
+
+
+# Get the timing recorder for the current session and bind it to this rerun
+def session_recorder():
+    if "perf_recorder" not in st.session_state:
+        st.session_state["perf_recorder"] = metrics.new_session_recorder()
+    recorder = st.session_state["perf_recorder"]
+    recorder.measure_bytes = st.session_state.get("perf_panel", False)
+    metrics.bind_session(recorder)
+    metrics.start_server()
+    return recorder
+
+
+def _summary_frame(rows):
+    frame = pd.DataFrame(rows, columns=["phase", "count", "p50_ms", "p95_ms", "total_ms", "bytes"])
+    return frame.set_index("phase")
+
+
+def _mb(nbytes):
+    return round(nbytes / memory.MB, 2)
+
+
+# Admin view of what the process keeps in memory between reruns
+def render_memory_panel():
+    st.markdown("### Memory")
+    now = time.time()
+    rows = []
+    for dataset in datasets.cached_datasets():
+        usage = dataset.memory_usage()
+        rows.append({"source": dataset.source, "rows": len(dataset), "frame_mb": _mb(usage["frame"]),
+                     "index_mb": _mb(usage["hashes"] + usage["indexes"]), "idle_s": round(now - dataset.last_used)})
+    st.caption("Datasets")
+    st.dataframe(pd.DataFrame(rows, columns=["source", "rows", "frame_mb", "index_mb", "idle_s"]))
+
+    stats = result_cache.RESULTS.stats()
+    st.caption(f"Result cache: {stats['entries']} entries, {_mb(stats['memory_bytes'])} MB in memory, "
+               f"{_mb(stats['spilled_bytes'])} MB spilled to disk, {stats['evictions']} evictions")
+
+    rows = [{"session": name, "state_mb": _mb(entry["state_bytes"]), "export_mb": _mb(entry["export_bytes"]),
+             "exports": entry["exports"]} for name, entry in memory.sessions().items()]
+    st.caption("Sessions")
+    st.dataframe(pd.DataFrame(rows, columns=["session", "state_mb", "export_mb", "exports"]))
+
+    budget = memory.budget_bytes()
+    st.caption(f"Accounted {_mb(datasets.accounted_bytes())} MB of "
+               f"{f'{_mb(budget)} MB budget' if budget else 'no budget'}; process RSS {_mb(memory.rss_bytes())} MB")
+
+
+# Opt-in sidebar panel with per-session and per-process phase timings
+def render_debug_panel(recorder):
+    memory.record_session(recorder.name, {key: value for key, value in st.session_state.items()
+                                          if key != "perf_recorder"})
+    with st.sidebar:
+        # Admins only: it lists every session's sources and uploads
+        if settings.ADMIN_PANEL and st.checkbox("Show memory usage", value=False, key="memory_panel",
+                                                help="Memory held by cached datasets, cached results and sessions"):
+            render_memory_panel()
+
+        show_panel = st.checkbox("Show performance panel", value=False, key="perf_panel",
+                                 help="Time each phase of the rerun and show p50/p95 latencies and bytes sent")
+        recorder.measure_bytes = show_panel
+        if not show_panel:
+            return
+
+        st.markdown("### Performance")
+        st.caption("This session")
+        st.dataframe(_summary_frame(recorder.summary()))
+        st.caption("All sessions in this process")
+        st.dataframe(_summary_frame(metrics.PROCESS.summary()))
+        for prefix, values in metrics.gauges().items():
+            st.caption(prefix.replace("_", " ").capitalize())
+            st.json(values, expanded=False)
+        if settings.METRICS_PORT:
+            st.caption(f"Metrics endpoint: http://{settings.METRICS_HOST}:{settings.METRICS_PORT}/metrics "
+                       "(Prometheus) and /metrics.json")
+        if st.button("Reset session timings"):
+            recorder.reset()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+import memory
+import metrics
+import settings
+
+# Process-wide cache of filter results. Keys are (dataset version, canonical
+# filter signature) and values are the matching row positions, so sessions
+# that pick the same filters get their rows back without any filtering work.
+# Structures derived from a result (e.g. sampling tables) are kept here too;
+# anything with an `nbytes` attribute counts against the same budget.
+# Arrays above the spill threshold are kept in memory-mapped files instead.
+
+
+# Move an array to a memory-mapped temporary file. The file is unlinked
+# right away where the OS allows it, so the disk space goes with the array.
+def spill(array):
+    directory = settings.SPILL_DIR or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"food-chooser-{uuid.uuid4().hex}.npy")
+    np.save(path, array)
+    mapped = np.load(path, mmap_mode="r")
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    return mapped
+
+
+def _memory_bytes(value):
+    return 0 if isinstance(value, np.memmap) else value.nbytes
+
+
+class ResultCache:
+    def __init__(self, max_bytes, spill_threshold=0):
+        self.max_bytes = max_bytes
+        self.spill_threshold = spill_threshold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._spilled_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return positions
+
+    def put(self, key, positions):
+        if positions.nbytes > self.max_bytes:
+            return
+        if isinstance(positions, np.ndarray):
+            if self.spill_threshold and positions.nbytes >= self.spill_threshold:
+                positions = spill(positions)
+                self.spills += 1
+            else:
+                # Shared between sessions, so nobody may modify it in place
+                positions.flags.writeable = False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._forget(old)
+            self._entries[key] = positions
+            self._bytes += positions.nbytes
+            if isinstance(positions, np.memmap):
+                self._spilled_bytes += positions.nbytes
+            # Least recently used entries go first
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._forget(evicted)
+                self.evictions += 1
+
+    def _forget(self, value):
+        self._bytes -= value.nbytes
+        if isinstance(value, np.memmap):
+            self._spilled_bytes -= value.nbytes
+
+    # Bytes held in memory (spilled entries only cost disk)
+    def memory_bytes(self):
+        with self._lock:
+            return self._bytes - self._spilled_bytes
+
+    # Free at least `needed` bytes of memory, coldest entries first: arrays
+    # are moved to disk, anything else is dropped. Returns the bytes freed.
+    def release(self, needed):
+        freed = 0
+        with self._lock:
+            for key in list(self._entries):
+                if freed >= needed:
+                    break
+                value = self._entries[key]
+                if isinstance(value, np.memmap):
+                    continue
+                if isinstance(value, np.ndarray):
+                    self._entries[key] = spill(value)
+                    self._spilled_bytes += value.nbytes
+                    self.spills += 1
+                else:
+                    del self._entries[key]
+                    self._forget(value)
+                    self.evictions += 1
+                freed += _memory_bytes(value)
+        return freed
+
+    # Drop everything computed on one version of a dataset
+    def drop_version(self, version):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == version]:
+                self._forget(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "memory_bytes": self._bytes - self._spilled_bytes,
+                "spilled_bytes": self._spilled_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spills": self.spills,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._spilled_bytes = 0
+
+
+RESULTS = ResultCache(int(settings.RESULT_CACHE_MB * memory.MB), memory.spill_threshold_bytes())
+metrics.register_gauges("result_cache", RESULTS.stats)
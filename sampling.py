@@ -0,0 +1,184 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+# Weighted random picks. An alias table is built once per candidate set
+# (filters + weight column) and then every draw costs O(1), so "pick again"
+# stays instant however many rows match.
+
+
+class AliasTable:
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype="float64")
+        size = len(weights)
+        self.size = size
+        self.weighted = weights > 0
+        self.positive = int(np.count_nonzero(self.weighted))
+        prob = np.ones(size)
+        alias = np.arange(size)
+        if self.positive:
+            # Vose's alias method, vectorised: every column holds 1/size of
+            # the mass, split between the row itself and one donor row
+            scaled = weights * (size / weights.sum())
+            small = np.flatnonzero(scaled < 1)
+            # Rows at exactly 1 fill their own column and have nothing to
+            # lend; left in the surplus chain, they would be charged for a
+            # neighbour's overdraw
+            large = np.flatnonzero(scaled > 1)
+            if len(small) and len(large):
+                # Lay the small rows' deficits and the large rows' surpluses
+                # end to end on two lines. A small row borrows from the large
+                # row whose surplus covers the start of its deficit; a large
+                # row overdrawn that way borrows the overshoot from the next.
+                deficit = 1 - scaled[small]
+                deficit_end = np.cumsum(deficit)
+                surplus_end = np.cumsum(scaled[large] - 1)
+                # Each start is exactly the previous end (not end - deficit,
+                # which rounds), so both searches agree on shared boundaries
+                deficit_start = np.concatenate(([0.0], deficit_end[:-1]))
+                donor = np.searchsorted(surplus_end, deficit_start, side="right")
+                prob[small] = scaled[small]
+                alias[small] = large[np.minimum(donor, len(large) - 1)]
+
+                crossing = np.searchsorted(deficit_end, surplus_end[:-1], side="left")
+                reached = deficit_end[np.minimum(crossing, len(small) - 1)]
+                overshoot = np.where(crossing < len(small), reached - surplus_end[:-1], 0.0)
+                prob[large[:-1]] = np.clip(1 - overshoot, 0.0, 1.0)
+                alias[large[:-1]] = large[1:]
+        self.prob = prob
+        self.alias = alias
+        # Shared between sessions through the result cache
+        self.prob.flags.writeable = False
+        self.alias.flags.writeable = False
+        self.nbytes = prob.nbytes + alias.nbytes + self.weighted.nbytes
+
+    def draw(self, rng=random):
+        column = rng.randrange(self.size)
+        return column if rng.random() < self.prob[column] else int(self.alias[column])
+
+    # Probability of each item per draw, as encoded in the table
+    def probabilities(self):
+        mass = self.prob + np.bincount(self.alias, weights=1 - self.prob, minlength=self.size)
+        return mass / self.size
+
+    # Many independent draws at once, for simulations
+    def draw_many(self, draws, generator):
+        columns = generator.integers(0, self.size, draws)
+        keep = generator.random(draws) < self.prob[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+    # Up to `count` distinct items, skipping `exclude` (e.g. recent picks).
+    # When too few eligible items remain, the rest is filled from the
+    # excluded and zero-weight ones rather than returning fewer rows.
+    def sample(self, count, rng=random, exclude=()):
+        count = min(count, self.size)
+        chosen = []
+        seen = set()
+        if self.positive:
+            attempts = 20 * count + 100
+            while len(chosen) < count and attempts:
+                attempts -= 1
+                item = self.draw(rng)
+                if item not in seen and item not in exclude:
+                    seen.add(item)
+                    chosen.append(item)
+        if len(chosen) < count:
+            # Rejection stalls when the eligible rows are nearly used up
+            taken = np.zeros(self.size, dtype=bool)
+            taken[chosen] = True
+            excluded = np.zeros(self.size, dtype=bool)
+            excluded[[item for item in exclude if 0 <= item < self.size]] = True
+            for pool in (self.weighted & ~excluded, ~excluded, excluded):
+                pool = np.flatnonzero(pool & ~taken)
+                take = [int(pool[i]) for i in rng.sample(range(len(pool)), min(count - len(chosen), len(pool)))]
+                chosen.extend(take)
+                taken[take] = True
+        return chosen
+
+
+# Turn a numeric column into sampling weights. "higher" weights rows by their
+# value (a 4-star dish is twice as likely as a 2-star one); "lower" mirrors
+# the range so the cheapest row gets the weight the dearest would have had.
+# Missing values get weight 0; an all-equal column gives uniform weights.
+def preference_weights(values, prefer="higher"):
+    values = np.asarray(values, dtype="float64")
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.ones(len(values))
+    low = values[finite].min()
+    high = values[finite].max()
+    if high == low:
+        return np.where(finite, 1.0, 0.0)
+    if prefer == "lower":
+        weights = high + max(low, 0.0) - values
+    else:
+        weights = values - min(low, 0.0)
+    return np.where(finite, np.maximum(weights, 0.0), 0.0)
+
+
+# Pick `count` of the sorted row `positions`, weighted by `table` when given,
+# leaving out rows in `recent` while enough other rows remain
+def pick_positions(positions, count, rng=random, table=None, recent=()):
+    exclude = set()
+    if len(recent):
+        recent = np.asarray(list(recent), dtype=np.intp)
+        index = np.searchsorted(positions, recent)
+        found = index < len(positions)
+        index = index[found]
+        exclude = set(index[positions[index] == recent[found]].tolist())
+    if table is not None:
+        return positions[table.sample(count, rng, exclude)]
+    count = min(count, len(positions))
+    # A uniform sample with room for the excluded rows, minus those rows,
+    # is still uniform over the rest
+    drawn = rng.sample(range(len(positions)), min(count + len(exclude), len(positions)))
+    chosen = [item for item in drawn if item not in exclude][:count]
+    if len(chosen) < count:
+        chosen += [item for item in drawn if item in exclude][:count - len(chosen)]
+    return positions[chosen]
+
+
+# Run `draws` single-row draws over `size` candidates in one vectorised pass
+# from the table the pick button uses (uniform without one); returns
+# per-candidate counts and the counts expected from the intended `weights`
+# (None = uniform), which don't depend on how the table encodes them
+def simulate_draws(size, draws, table=None, weights=None, seed=None):
+    generator = np.random.default_rng(seed)
+    if table is None:
+        items = generator.integers(0, size, draws)
+    else:
+        items = table.draw_many(draws, generator)
+    weights = np.ones(size) if weights is None else np.asarray(weights, dtype="float64")
+    if not weights.sum() > 0:
+        # Without positive weights the picker falls back to uniform
+        weights = np.ones(size)
+    return np.bincount(items, minlength=size), weights / weights.sum() * draws
+
+
+# Pearson chi-square goodness of fit; returns (statistic, degrees of freedom,
+# p-value). The p-value uses the Wilson-Hilferty approximation, which is
+# close enough for a fairness check without pulling in scipy.
+def chi_square(observed, expected):
+    observed = np.asarray(observed, dtype="float64")
+    expected = np.asarray(expected, dtype="float64")
+    cells = expected > 0
+    statistic = float(np.sum((observed[cells] - expected[cells]) ** 2 / expected[cells]))
+    dof = int(np.count_nonzero(cells)) - 1
+    if dof < 1:
+        return statistic, dof, 1.0
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return statistic, dof, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+# Observed vs expected picks per value of a category column
+def category_frequencies(categories, observed, expected):
+    frame = pd.DataFrame({
+        "category": pd.Series(categories).astype(str).to_numpy(),
+        "observed": observed,
+        "expected": expected,
+    })
+    grouped = frame.groupby("category", sort=True)[["observed", "expected"]].sum()
+    grouped["ratio"] = grouped["observed"] / grouped["expected"]
+    return grouped
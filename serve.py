@@ -0,0 +1,36 @@
+import argparse
+import logging
+import os
+import sys
+
+import warmup
+
+# Start the enhanced app with its sheets already loading, e.g.
+#   python serve.py                      # warm FOOD_WARMUP_SHEETS, then serve
+#   python serve.py --wait 60 -- --server.port 8502
+# Arguments after "--" go to `streamlit run`. The warm-up threads run in the
+# Streamlit server process, so sessions share the datasets they load.
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_enhanced.py")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm up the configured sheets and run the enhanced app.")
+    parser.add_argument("--wait", type=float, default=0,
+                        help="Seconds to wait for warm-up before accepting connections (default: don't wait)")
+    parser.add_argument("streamlit_args", nargs="*", help="Extra arguments for `streamlit run`")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    warmup.start()
+    if args.wait and not warmup.wait(args.wait):
+        logging.getLogger(__name__).warning("Warm-up still running after %.0fs; starting the server anyway", args.wait)
+
+    from streamlit.web import cli as streamlit_cli
+
+    sys.argv = ["streamlit", "run", APP, *args.streamlit_args]
+    return streamlit_cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import argparse
+import json
+import logging
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import datasets
+import engine
+import metrics
+import sampling
+import settings
+
+logger = metrics.get_logger(__name__)
+
+# Small local JSON service answering "give me N random rows matching these
+# filters" from the shared dataset store, e.g.
+#   curl -d '{"filters": {"Type": ["Rice"]}, "count": 3}' http://127.0.0.1:8600/pick
+# or, with the filters of a link shared from the enhanced app,
+#   curl 'http://127.0.0.1:8600/pick?token=<filters value from the link>&count=3'
+# Picks are weighted like the enhanced app's with "weight" (a numeric column)
+# and "prefer" ("higher" or "lower").
+
+# Upper bound on rows returned by a single pick
+MAX_PICK_COUNT = 1000
+
+# Sources the service may load; requests can only pick from these
+_sources = {}
+
+
+def add_source(source, skip_first_row=True):
+    _sources[source] = skip_first_row
+
+
+def _default_source():
+    if not _sources:
+        add_source(settings.DEFAULT_SHEET_URL)
+    return next(iter(_sources))
+
+
+class PickError(Exception):
+    pass
+
+
+# Filters from a request, checked against the dataset's columns; bad client
+# input raises PickError rather than failing somewhere inside the filtering
+def _request_filters(request, frame):
+    if request.get("token"):
+        # The filters of a shared link from the enhanced app (?filters=<token>)
+        try:
+            filters = engine.parse_filter_token(request["token"])
+        except ValueError as e:
+            raise PickError(str(e))
+    else:
+        spec = request.get("filters") or {}
+        if not isinstance(spec, dict):
+            raise PickError("filters must be a JSON object")
+        try:
+            filters = engine.normalize_filters(spec)
+        except (TypeError, ValueError) as e:
+            raise PickError(f"Invalid filters: {e}")
+    unknown = [column for column in filters if column not in frame.columns]
+    if unknown:
+        raise PickError(f"Unknown column(s): {', '.join(map(str, unknown))}")
+    for column, values in filters.items():
+        if isinstance(values, tuple):
+            dtype = frame[column].dtype
+            if not engine.is_range_dtype(dtype):
+                raise PickError(f"{column} is not a number or date column; filter it with a list of values")
+            dates = pd.api.types.is_datetime64_any_dtype(dtype)
+            if any(isinstance(bound, pd.Timestamp) != dates for bound in values if not engine.is_open_bound(bound)):
+                raise PickError(f"Range bounds for {column} must be {'dates' if dates else 'numbers'}")
+        elif not all(value is None or isinstance(value, (str, int, float)) for value in values):
+            raise PickError(f"Values for {column} must be strings or numbers")
+    return filters
+
+
+# Answer one pick request; returns the JSON response body
+def pick(request):
+    if not isinstance(request, dict):
+        raise PickError("request must be a JSON object")
+    source = request.get("source") or _default_source()
+    if not isinstance(source, str) or source not in _sources:
+        raise PickError(f"Unknown source: {source}")
+    try:
+        count = int(request.get("count", 10))
+    except (TypeError, ValueError):
+        raise PickError("count must be an integer")
+    if not 1 <= count <= MAX_PICK_COUNT:
+        raise PickError(f"count must be between 1 and {MAX_PICK_COUNT}")
+
+    seed = request.get("seed")
+    if seed is not None and not isinstance(seed, (int, float, str)):
+        raise PickError("seed must be a number or a string")
+    weight = request.get("weight")
+    prefer = request.get("prefer", "higher")
+    if prefer not in ("higher", "lower"):
+        raise PickError('prefer must be "higher" or "lower"')
+    columns = request.get("columns")
+    if columns is not None and not (isinstance(columns, list) and all(isinstance(column, str) for column in columns)):
+        raise PickError("columns must be a list of column names")
+
+    dataset = datasets.get_dataset(source, _sources[source])
+    filters = _request_filters(request, dataset.frame)
+    if weight is not None and not (weight in dataset.frame.columns
+                                   and pd.api.types.is_numeric_dtype(dataset.frame[weight].dtype)):
+        raise PickError(f"weight must be a numeric column: {weight}")
+
+    with metrics.span("service_pick"):
+        positions = dataset.filter_positions(filters)
+        rng = random.Random(seed) if seed is not None else random
+        # The enhanced app's picker, without its per-session no-repeat history
+        table = dataset.alias_table(filters, weight, prefer) if weight is not None else None
+        picked = sampling.pick_positions(positions, count, rng, table)
+        rows = dataset.frame.iloc[picked]
+        if columns:
+            rows = rows[[column for column in columns if column in rows.columns]]
+        # pandas writes NaN as null, which json.dumps would not
+        body = rows.to_json(orient="records", force_ascii=False, date_format="iso")
+    return (f'{{"version": "{dataset.version}", "matched": {len(positions)}, '
+            f'"count": {rows.shape[0]}, "rows": {body}}}')
+
+
+class _PickHandler(BaseHTTPRequestHandler):
+    # Keep-alive so clients don't pay a TCP handshake per pick, and no Nagle
+    # delay between the headers and the body of small responses
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, request):
+        try:
+            self._send(200, pick(request))
+        except PickError as e:
+            self._send(400, json.dumps({"error": str(e)}))
+        except Exception as e:
+            logger.exception("Pick failed")
+            self._send(500, json.dumps({"error": str(e)}))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send(200, json.dumps({"status": "ok", "sources": list(_sources)}))
+            return
+        if url.path != "/pick":
+            self._send(404, json.dumps({"error": "not found"}))
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if "filters" in query:
+                query["filters"] = json.loads(query["filters"])
+            if "columns" in query:
+                query["columns"] = query["columns"].split(",")
+        except ValueError:
+            self._send(400, json.dumps({"error": "filters must be JSON"}))
+            return
+        self._handle(query)
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/pick":
+            self._send(404, json.dumps({"error": "not found"}))
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, json.dumps({"error": "body must be JSON"}))
+            return
+        self._handle(request)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+# Start the service once per process; later calls are no-ops
+def start_server(port=None, host=None):
+    global _server, _server_failed
+    port = settings.SERVICE_PORT if port is None else port
+    host = host or settings.SERVICE_HOST
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _PickHandler)
+            except OSError as e:
+                logger.warning("Pick service disabled: %s", e)
+                _server_failed = True
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="food-chooser-service", daemon=True).start()
+    return _server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve random picks over HTTP.")
+    parser.add_argument("--source", action="append", default=[],
+                        help="Sheet URL or local CSV snapshot to serve (repeatable, default: FOOD_SHEET_URL)")
+    parser.add_argument("--no-skip-first-row", action="store_true", help="Use row 1 as header")
+    parser.add_argument("--host", default=settings.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVICE_PORT or 8600)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    for source in args.source or [settings.DEFAULT_SHEET_URL]:
+        add_source(source, not args.no_skip_first_row)
+        # Load and index up front so the first request is fast
+        datasets.get_dataset(source, _sources[source]).build_indexes()
+    metrics.start_server()
+
+    server = ThreadingHTTPServer((args.host, args.port), _PickHandler)
+    server.daemon_threads = True
+    logger.info("Serving picks on http://%s:%s/pick", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
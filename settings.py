@@ -0,0 +1,91 @@
+import os
+
+# Runtime settings, read once from environment variables so the same values
+# apply to both apps and to any helper processes started next to them.
+
+# Local endpoint exposing timing metrics (/metrics and /metrics.json).
+# 0 disables the endpoint.
+METRICS_HOST = os.environ.get("FOOD_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("FOOD_METRICS_PORT", "0") or 0)
+
+# Number of samples kept per phase for percentile calculations
+METRICS_MAX_SAMPLES = int(os.environ.get("FOOD_METRICS_MAX_SAMPLES", "1000"))
+
+# Level of the app's own log messages (warm-up, refreshes, evictions, ...),
+# written to stderr next to Streamlit's
+LOG_LEVEL = os.environ.get("FOOD_LOG_LEVEL", "INFO").upper()
+
+# Sheet shown by app_enhanced.py and served by default by the pick service
+DEFAULT_SHEET_URL = os.environ.get(
+    "FOOD_SHEET_URL",
+    "https://docs.google.com/spreadsheets/d/18rWwTejbYT2xrmkVSkRR9-2BCHi0pQyIq_0io-A4DYU/edit?gid=622814645#gid=622814645",
+)
+
+# Sheets loaded, profiled and indexed in the background when the server
+# starts, separated by commas or newlines. Defaults to FOOD_SHEET_URL;
+# set it to an empty string to turn warm-up off.
+WARMUP_SHEETS = [
+    url.strip() for url in os.environ.get("FOOD_WARMUP_SHEETS", DEFAULT_SHEET_URL).replace("\n", ",").split(",")
+    if url.strip()
+]
+
+# Folder the basic app may open local CSV/Excel/Parquet snapshots from, by
+# name; unset, it only opens Google Sheets. Paths outside it are refused so
+# visitors can't read other files on the server.
+SNAPSHOT_DIR = os.environ.get("FOOD_SNAPSHOT_DIR") or None
+
+# How long a loaded sheet is reused before it is fetched again (seconds)
+DATASET_TTL = int(os.environ.get("FOOD_DATASET_TTL", "600"))
+
+# Local JSON "pick for me" service. When FOOD_SERVICE_PORT is set the
+# enhanced app also starts it in-process so both share the same datasets.
+SERVICE_HOST = os.environ.get("FOOD_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("FOOD_SERVICE_PORT", "0") or 0)
+
+# Memory budget for the cross-session cache of filter results (MB)
+RESULT_CACHE_MB = float(os.environ.get("FOOD_RESULT_CACHE_MB", "64"))
+
+# Engine for filtering and statistics: pandas, duckdb, polars or auto
+# (first of duckdb/polars that is installed). Falls back to pandas.
+QUERY_BACKEND = os.environ.get("FOOD_QUERY_BACKEND", "pandas").lower()
+
+# Worker threads for the DuckDB backend; 0 lets it use all cores
+QUERY_THREADS = int(os.environ.get("FOOD_QUERY_THREADS", "0"))
+
+# Where sheets are fetched from; point it at a local stand-in for tests,
+# e.g. FOOD_SHEETS_BASE_URL=http://127.0.0.1:8700 (see benchmarks/sheet_stub.py)
+SHEETS_BASE_URL = os.environ.get("FOOD_SHEETS_BASE_URL", "https://docs.google.com").rstrip("/")
+
+# CSV parser: "arrow" (multithreaded pyarrow reader, falls back to pandas
+# for files it can't read the same way) or "pandas"
+CSV_PARSER = os.environ.get("FOOD_CSV_PARSER", "arrow").lower()
+
+# Memory budget for cached datasets, cached results and session state (MB).
+# Over budget, the coldest cached results go to disk or are dropped first,
+# then the least recently used datasets. 0 means no budget.
+MEMORY_BUDGET_MB = float(os.environ.get("FOOD_MEMORY_BUDGET_MB", "0"))
+
+# Show the "Show memory usage" admin view (every cached source, including
+# other sessions' uploads, and per-session memory) in the sidebar ("1")
+ADMIN_PANEL = os.environ.get("FOOD_ADMIN_PANEL", "0") == "1"
+
+# Cached results and export files larger than this are kept on disk
+# (memory-mapped) instead of in memory (MB); 0 keeps everything in memory
+SPILL_THRESHOLD_MB = float(os.environ.get("FOOD_SPILL_THRESHOLD_MB", "16"))
+
+# Directory for spilled data; defaults to the system temp directory
+SPILL_DIR = os.environ.get("FOOD_SPILL_DIR") or None
+
+# Convert text columns holding formatted numbers, prices, percentages or
+# dates to numeric/date columns when a sheet is loaded ("0" turns it off).
+# A column is converted only when all its non-blank cells parse.
+COERCE_TYPES = os.environ.get("FOOD_COERCE_TYPES", "1") != "0"
+
+# How to read dates like 03/04/2024 when no day or month is above 12:
+# "dmy" (3 April) or "mdy" (March 4)
+DATE_ORDER = os.environ.get("FOOD_DATE_ORDER", "dmy").lower()
+
+# Results tables show the first DISPLAY_COLUMNS columns until the user picks
+# others, and cut text cells longer than DISPLAY_MAX_CHARS (0 = no limit)
+DISPLAY_COLUMNS = int(os.environ.get("FOOD_DISPLAY_COLUMNS", "12"))
+DISPLAY_MAX_CHARS = int(os.environ.get("FOOD_DISPLAY_MAX_CHARS", "100"))
@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+import backends
+import datasets
+import engine
+
+
+@pytest.mark.parametrize("backend_class, module", [
+    (backends.DuckDBBackend, "duckdb"),
+    (backends.PolarsBackend, "polars"),
+])
+def test_open_ended_ranges_match_pandas(backend_class, module):
+    pytest.importorskip(module)
+    frame = pd.DataFrame({
+        "Name": ["Pho", "Com", "Bun", "Banh mi"],
+        "Price": [45000.0, 30000.0, None, 20000.0],
+        "Added": pd.to_datetime(["2024-01-31", "2024-02-15", "2024-03-01", None]),
+    })
+    dataset = datasets.Dataset("backend-test", False, frame)
+    backend = backend_class()
+    for spec in ({"Added": {"min": "2024-02-01"}}, {"Added": {"max": "2024-02-01"}},
+                 {"Price": {"min": 25000}}, {"Price": {}}, {"Added": {"max": "2024-03-01"}, "Price": {"max": 40000}}):
+        filters = engine.normalize_filters(spec)
+        expected = engine.apply_filters(frame, filters).index.tolist()
+        assert backend.filter_positions(dataset, filters).tolist() == expected, spec
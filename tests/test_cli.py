@@ -0,0 +1,22 @@
+import json
+
+import cli
+
+
+def test_long_inline_filters_are_not_taken_for_a_path():
+    spec = json.dumps({"Name": [f"Dish number {i}" for i in range(30)]})
+    assert len(spec) > 255
+    assert cli.load_filter_spec(spec) == {"Name": [f"Dish number {i}" for i in range(30)]}
+
+
+def test_filters_from_a_file(tmp_path):
+    path = tmp_path / "veg.json"
+    path.write_text('{"Veg": ["Yes"]}', encoding="utf-8")
+    assert cli.load_filter_spec(str(path)) == {"Veg": ["Yes"]}
+
+
+def test_bad_filters_exit_with_usage_error(tmp_path, capsys):
+    path = tmp_path / "menu.csv"
+    path.write_text("Name\nPho\n", encoding="utf-8")
+    assert cli.main(["--csv", str(path), "--filters", '{"Name": ']) == 2
+    assert "Invalid --filters" in capsys.readouterr().err
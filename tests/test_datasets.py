@@ -0,0 +1,120 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+import datasets
+import engine
+
+
+def load_upload(file_id, text="Name,Price\nPho,45000\nCom,30000\n"):
+    upload = io.BytesIO(text.encode("utf-8"))
+    source = datasets.upload_source(file_id, "menu.csv")
+    return datasets.get_dataset(source, False, loader=lambda: engine.read_file(upload, "menu.csv", False))
+
+
+def cached_sources():
+    return {dataset.source for dataset in datasets.cached_datasets()}
+
+
+def test_replaced_upload_is_discarded():
+    first = load_upload("a1")
+    assert first.source in cached_sources()
+    datasets.discard(first.source, False)
+    assert first.source not in cached_sources()
+
+
+def test_idle_uploads_are_evicted():
+    idle = load_upload("b1")
+    fresh = load_upload("b2")
+    idle.last_used = time.time() - 3600
+    assert datasets.evict_idle_uploads(idle=600) == 1
+    assert idle.source not in cached_sources()
+    assert fresh.source in cached_sources()
+    datasets.discard(fresh.source, False)
+
+
+def test_upload_is_read_with_converted_types():
+    dataset = load_upload("c1", "Name,Price\nPho,45.000đ\nCom,30.000đ\n")
+    assert pd.api.types.is_numeric_dtype(dataset.frame["Price"])
+    assert [entry["kind"] for entry in dataset.coercions] == ["text", "currency"]
+    datasets.discard(dataset.source, False)
+
+
+def random_rows(rng, count):
+    added = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 60, count), unit="D")
+    return pd.DataFrame({
+        "Rating": rng.integers(1, 6, count),
+        "Type": rng.choice(["Rice", "Noodles", "Soup", "Bread"], count),
+        "Price": np.where(rng.random(count) < 0.2, np.nan, rng.integers(20, 80, count) * 1000.0),
+        "Added": added.where(rng.random(count) >= 0.1),
+    })
+
+
+def derive_all(dataset):
+    dataset.build_indexes()
+    dataset.unique_counts()
+    dataset.column_stats()
+    for column in dataset.frame.columns:
+        dataset.filter_options(column)
+        dataset.filter_options(column, as_text=True)
+
+
+def test_refresh_matches_a_full_rebuild():
+    rng = np.random.default_rng(7)
+    for trial in range(60):
+        old_frame = random_rows(rng, 200)
+        new_frame = old_frame.copy()
+        change = trial % 3
+        if change == 0:
+            new_frame = pd.concat([new_frame, random_rows(rng, int(rng.integers(1, 15)))], ignore_index=True)
+        elif change == 1:
+            rows = rng.choice(len(new_frame), int(rng.integers(1, 15)), replace=False)
+            new_frame.iloc[rows] = random_rows(rng, len(rows)).to_numpy()
+            new_frame = new_frame.astype(old_frame.dtypes)
+        else:
+            new_frame = new_frame.iloc[:len(new_frame) - int(rng.integers(1, 15))]
+        previous = datasets.Dataset("refresh-test", False, old_frame)
+        derive_all(previous)
+        refreshed = datasets.Dataset("refresh-test", False, new_frame)
+        assert refreshed.inherit(previous) is not None, trial
+        rebuilt = datasets.Dataset("refresh-test", False, new_frame)
+        derive_all(rebuilt)
+
+        for column in new_frame.columns:
+            got, want = refreshed.index(column), rebuilt.index(column)
+            assert got.positions.keys() == want.positions.keys(), (trial, column)
+            for key, rows in want.positions.items():
+                np.testing.assert_array_equal(got.positions[key], rows)
+            if want.numeric:
+                np.testing.assert_array_equal(got.sorted_values, want.sorted_values)
+                # Ties may be ordered differently; the order must sort the column
+                np.testing.assert_array_equal(datasets.range_values(new_frame[column])[got.order], got.sorted_values)
+                assert sorted(got.order) == list(range(len(new_frame)))
+        assert refreshed.unique_counts() == rebuilt.unique_counts(), trial
+        for column in new_frame.columns:
+            for as_text in (False, True):
+                assert refreshed.filter_options(column, as_text=as_text) == rebuilt.filter_options(column, as_text=as_text)
+        got_counts, got_means = refreshed.column_stats()
+        want_counts, want_means = rebuilt.column_stats()
+        pd.testing.assert_series_equal(got_counts, want_counts)
+        pd.testing.assert_series_equal(got_means, want_means, check_exact=False, rtol=1e-9)
+
+
+def test_budget_spills_results_then_evicts_idle_datasets(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets.settings, "SPILL_DIR", str(tmp_path))
+    monkeypatch.setattr(datasets.result_cache, "RESULTS", datasets.result_cache.ResultCache(10_000_000))
+    datasets.clear()
+    idle = load_upload("d1")
+    served = load_upload("d2")
+    idle.last_used = 0
+    datasets.result_cache.RESULTS.put(("v1", "{}"), np.arange(50_000))
+    results = datasets.result_cache.RESULTS.memory_bytes()
+    budget = datasets.accounted_bytes() - results - 1
+    monkeypatch.setattr(datasets.settings, "MEMORY_BUDGET_MB", budget / datasets.memory.MB)
+    assert datasets.enforce_budget(protect=served) >= results + 1
+    assert datasets.result_cache.RESULTS.memory_bytes() == 0
+    assert idle.source not in cached_sources()
+    assert served.source in cached_sources()
+    datasets.clear()
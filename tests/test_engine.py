@@ -0,0 +1,127 @@
+import urllib.error
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import engine
+
+
+def write_sheet(path):
+    path.write_text("Title\nName,Price,Added\nPho,45.000đ,31/01/2024\nCom,30.000đ,15/02/2024\n"
+                    "Bun,60.000đ,01/03/2024\n", encoding="utf-8")
+    return str(path)
+
+
+def test_loading_converts_formatted_columns_for_every_consumer(tmp_path):
+    data = engine.load_source(write_sheet(tmp_path / "sheet.csv"))
+    assert pd.api.types.is_numeric_dtype(data["Price"])
+    assert pd.api.types.is_datetime64_any_dtype(data["Added"])
+    assert {entry["column"]: entry["kind"] for entry in data.attrs["coercions"]} == {
+        "Name": "text", "Price": "currency", "Added": "date"}
+
+    filters = engine.normalize_filters({"Price": {"max": 50000}, "Added": {"min": "2024-02-01"}})
+    assert engine.apply_filters(data, filters)["Name"].tolist() == ["Com"]
+
+
+def test_reloads_read_a_fixed_column_as_numbers_again(monkeypatch):
+    monkeypatch.setattr(engine.settings, "CSV_PARSER", "arrow")
+    monkeypatch.setattr(engine, "_arrow_column_types", {})
+    stray = b"Title\nName,Price,Added\nPho,45000,2024-01-31\nCom,ask,2024-02-15\n"
+    fixed = b"Title\nName,Price,Added\nPho,45000,2024-01-31\nCom,30000,2024-02-15\n"
+    assert not pd.api.types.is_numeric_dtype(engine.read_csv(stray, types_key="sheet")["Price"])
+    for _ in range(2):
+        data = engine.read_csv(fixed, types_key="sheet")
+        assert pd.api.types.is_integer_dtype(data["Price"])
+        assert not pd.api.types.is_datetime64_any_dtype(data["Added"])
+    assert not pd.api.types.is_numeric_dtype(engine.read_csv(stray, types_key="sheet")["Price"])
+
+
+def test_pushdown_reports_whether_the_query_was_used(monkeypatch):
+    sheet = "https://docs.google.com/spreadsheets/d/abc/edit"
+    export = b"Title\nName,Price,Added\nPho,45000,2024-01-31\nCom,30000,2024-02-15\n"
+    queries = []
+
+    def fetch(url):
+        if "/gviz/" not in url:
+            return export
+        queries.append(urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)["tq"][0])
+        return b"Name,Price,Added\nCom,30000,2024-02-15\n"
+
+    monkeypatch.setattr(engine, "fetch_csv", fetch)
+    filters = engine.normalize_filters({"Price": {"max": 40000}, "Added": {"min": "2024-02-01"}})
+    data, pushed_down = engine.load_sheet_pushdown(sheet, filters=filters)
+    assert pushed_down and data["Name"].tolist() == ["Com"]
+    # Date bounds are left to the local re-check
+    assert queries[-1] == "select * where B <= 40000.0"
+
+    def offline(url):
+        if "/gviz/" in url:
+            raise urllib.error.URLError("offline")
+        return export
+
+    monkeypatch.setattr(engine, "fetch_csv", offline)
+    data, pushed_down = engine.load_sheet_pushdown(sheet, filters=filters)
+    assert not pushed_down and data["Name"].tolist() == ["Com"]
+
+
+def test_snapshot_paths_stay_in_the_snapshot_folder(tmp_path, monkeypatch):
+    (tmp_path / "menu.csv").write_text("Name\nPho\n", encoding="utf-8")
+    (tmp_path / "secrets.toml").write_text("key = 1\n", encoding="utf-8")
+    monkeypatch.setattr(engine.settings, "SNAPSHOT_DIR", None)
+    with pytest.raises(ValueError):
+        engine.snapshot_path("menu.csv")
+    monkeypatch.setattr(engine.settings, "SNAPSHOT_DIR", str(tmp_path))
+    assert engine.snapshot_path("menu.csv") == str((tmp_path / "menu.csv").resolve())
+    for name in ("/etc/passwd", "../menu.csv", "secrets.toml", str(tmp_path / ".." / "x.csv")):
+        with pytest.raises(ValueError):
+            engine.snapshot_path(name)
+
+
+def test_leading_zero_groups_are_decimals():
+    data = engine.coerce_types(engine.read_csv(b"Name,Rate\nA,0.100\nB,0.105\nC,1.250\n", skip_first_row=False))
+    assert data["Rate"].tolist() == [0.1, 0.105, 1.25]
+
+
+def test_columns_with_unparsed_cells_stay_text():
+    raw = b"Name,Price\n" + b"".join(b"Dish %d,%d.000\n" % (i, 20 + i) for i in range(30)) + b"Bun,TBD\n"
+    data = engine.coerce_types(engine.read_csv(raw, skip_first_row=False))
+    assert data["Price"].tolist()[-2:] == ["49.000", "TBD"]
+    report = {entry["column"]: entry for entry in data.attrs["coercions"]}["Price"]
+    assert (report["kind"], report["unparsed"], report["examples"]) == ("text", 1, "TBD")
+
+
+def test_filter_tokens_round_trip():
+    day_end = pd.Timestamp("2024-02-29 23:59:59.999999999")
+    filters = {
+        "Added": (pd.Timestamp("2024-02-01"), day_end),
+        "Price": (float("-inf"), 50000.0),
+        "Rating": [np.int64(5), np.int64(4)],
+        "Type": ["Rice", "Soup"],
+    }
+    token = engine.filter_token(filters)
+    assert "=" not in token and "+" not in token and "/" not in token
+    parsed = engine.parse_filter_token(token)
+    assert parsed["Added"] == filters["Added"]
+    assert parsed["Price"] == (float("-inf"), 50000.0) and engine.is_open_bound(parsed["Price"][0])
+    assert sorted(parsed["Rating"]) == [4, 5]
+    assert engine.filter_signature(parsed) == engine.filter_signature(filters)
+    assert engine.filter_token(parsed) == token
+
+
+def test_filter_tokens_ignore_order_and_numpy_scalars():
+    first = {"Type": ["Soup", "Rice"], "Rating": [np.int64(4), np.int64(5)], "Veg": []}
+    second = {"Rating": [5, 4], "Type": ["Rice", "Soup"]}
+    assert engine.filter_token(first) == engine.filter_token(second)
+    assert engine.filter_token({}) == engine.filter_token({"Veg": []}) == ""
+    assert engine.parse_filter_token("") == {}
+
+
+def test_oversized_or_garbled_filter_tokens_are_rejected():
+    huge = engine.filter_token({"Name": [f"dish {i}" for i in range(10_000)]})
+    with pytest.raises(ValueError, match="too large"):
+        engine.parse_filter_token(huge)
+    for token in ("not a token", engine.filter_token({"Type": ["Rice"]})[:-4] + "AAAA", "AAAA"):
+        with pytest.raises(ValueError):
+            engine.parse_filter_token(token)
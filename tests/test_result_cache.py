@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import result_cache
+
+
+class Derived:
+    # Stands in for structures like sampling tables: not an array, has nbytes
+    nbytes = 1000
+
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache.settings, "SPILL_DIR", str(tmp_path))
+
+
+def test_large_results_are_spilled_and_small_ones_frozen():
+    cache = result_cache.ResultCache(10_000_000, spill_threshold=80_000)
+    cache.put(("v1", "small"), np.arange(100))
+    cache.put(("v1", "large"), np.arange(20_000))
+    assert not cache.get(("v1", "small")).flags.writeable
+    large = cache.get(("v1", "large"))
+    assert isinstance(large, np.memmap)
+    np.testing.assert_array_equal(large, np.arange(20_000))
+    assert cache.stats()["spills"] == 1
+    assert cache.memory_bytes() == np.arange(100).nbytes
+
+
+def test_release_spills_arrays_and_drops_the_rest_coldest_first():
+    cache = result_cache.ResultCache(10_000_000)
+    cache.put(("v1", "cold"), np.arange(1000))
+    cache.put(("v1", "table"), Derived())
+    cache.put(("v1", "warm"), np.arange(1000))
+    cache.get(("v1", "cold"))
+    # Order is now table, warm, cold
+    freed = cache.release(Derived.nbytes + 1)
+    assert freed == Derived.nbytes + np.arange(1000).nbytes
+    assert cache.get(("v1", "table")) is None
+    assert isinstance(cache.get(("v1", "warm")), np.memmap)
+    assert not isinstance(cache.get(("v1", "cold")), np.memmap)
+    assert cache.memory_bytes() == np.arange(1000).nbytes
+    assert cache.stats()["bytes"] == 2 * np.arange(1000).nbytes
+
+
+def test_least_recently_used_results_are_evicted():
+    size = np.arange(1000).nbytes
+    cache = result_cache.ResultCache(2 * size)
+    cache.put(("v1", "a"), np.arange(1000))
+    cache.put(("v1", "b"), np.arange(1000))
+    cache.get(("v1", "a"))
+    cache.put(("v1", "c"), np.arange(1000))
+    assert cache.get(("v1", "b")) is None
+    assert cache.get(("v1", "a")) is not None and cache.get(("v1", "c")) is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+import pytest
+
+import sampling
+
+
+def assert_encodes(weights):
+    weights = np.asarray(weights, dtype="float64")
+    table = sampling.AliasTable(weights)
+    np.testing.assert_allclose(table.probabilities(), weights / weights.sum(), rtol=0, atol=1e-12)
+
+
+def test_row_at_the_mean_keeps_its_weight():
+    weights = sampling.preference_weights([1, 2, 3, 4, 5])
+    np.testing.assert_allclose(sampling.AliasTable(weights).probabilities(),
+                               [1 / 15, 2 / 15, 3 / 15, 4 / 15, 5 / 15], atol=1e-12)
+
+
+@pytest.mark.parametrize("weights", [
+    [3, 3, 3],
+    [1, 3, 5, 3],
+    [3, 1, 5],
+    [2, 3, 0, 5, 5, 0],
+    [0, 0, 4],
+    [0.1, 0.2, 0.3, 0.4],
+])
+def test_probabilities_match_weights(weights):
+    assert_encodes(weights)
+
+
+def test_probabilities_match_random_integer_ratings():
+    generator = np.random.default_rng(0)
+    for _ in range(2000):
+        ratings = generator.integers(1, 6, generator.integers(2, 40))
+        assert_encodes(sampling.preference_weights(ratings))
+        assert_encodes(sampling.preference_weights(ratings, "lower"))
+
+
+def test_sample_returns_distinct_rows_and_skips_excluded():
+    table = sampling.AliasTable(sampling.preference_weights([1, 2, 3, 4, 5]))
+    chosen = table.sample(3, random.Random(1), exclude={4})
+    assert len(set(chosen)) == 3
+    assert 4 not in chosen
+
+
+def test_simulation_expects_the_weights_not_the_table():
+    weights = sampling.preference_weights([1, 2, 3, 4, 5])
+    table = sampling.AliasTable(weights)
+    observed, expected = sampling.simulate_draws(5, 50_000, table, weights, seed=3)
+    np.testing.assert_allclose(expected, weights / weights.sum() * 50_000)
+    assert observed.sum() == 50_000
+    assert sampling.chi_square(observed, expected)[2] > 0.001
+
+
+def test_simulation_flags_a_table_that_disagrees_with_the_weights():
+    weights = sampling.preference_weights([1, 2, 3, 4, 5])
+    skewed = sampling.AliasTable([1, 2, 1, 6, 5])
+    observed, expected = sampling.simulate_draws(5, 50_000, skewed, weights, seed=3)
+    assert sampling.chi_square(observed, expected)[2] < 1e-6
+
+
+def test_uniform_simulation():
+    observed, expected = sampling.simulate_draws(4, 20_000, seed=1)
+    np.testing.assert_allclose(expected, 5000)
+    assert sampling.chi_square(observed, expected)[2] > 0.001
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import service
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "sheet.csv"
+    path.write_text("Name,Type,Price,Added\nPho,Soup,45000,2024-01-31\nCom,Rice,30000,2024-02-15\n"
+                    "Bun,Noodles,60000,2024-03-01\n", encoding="utf-8")
+    service.add_source(str(path), False)
+    return str(path)
+
+
+def test_weighted_picks_with_a_float_seed(source):
+    request = {"source": source, "count": 2, "weight": "Price", "prefer": "lower", "seed": 0.25}
+    first = json.loads(service.pick(request))
+    assert first["count"] == 2
+    assert first == json.loads(service.pick(request))
+
+
+def test_pick_with_ranges(source):
+    body = json.loads(service.pick({"source": source, "filters": {"Price": {"max": 50000}, "Added": {"min": "2024-02-01"}}}))
+    assert body["matched"] == 1
+    assert body["rows"][0]["Name"] == "Com"
+
+
+@pytest.mark.parametrize("request_body", [
+    [1, 2],
+    {"filters": [1]},
+    {"filters": {"Name": {"min": 1}}},
+    {"filters": {"Price": {"min": "abc"}}},
+    {"filters": {"Price": {"min": "2024-01-01"}}},
+    {"filters": {"Added": {"max": 5}}},
+    {"filters": {"Type": [{"a": 1}]}},
+    {"filters": {"Nope": ["x"]}},
+    {"seed": {}},
+    {"weight": "Name"},
+    {"weight": "Price", "prefer": "cheaper"},
+    {"columns": 5},
+    {"token": "not a token"},
+])
+def test_bad_requests_are_client_errors(source, request_body):
+    if isinstance(request_body, dict):
+        request_body = dict(request_body, source=source)
+    with pytest.raises(service.PickError):
+        service.pick(request_body)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import datasets
+import metrics
+import settings
+
+logger = metrics.get_logger(__name__)
+
+# Load, profile and index the configured sheets in background threads when
+# the server starts, so the first session finds them in the dataset store.
+# A session that arrives mid warm-up waits on the same load instead of
+# starting its own (see datasets.get_dataset).
+
+_threads = []
+_status = {}
+_started = False
+_lock = threading.Lock()
+
+
+def warm(source, skip_first_row=True):
+    _status[source] = {"state": "loading"}
+    timings = {}
+    start = last = time.perf_counter()
+    try:
+        dataset = datasets.get_dataset(source, skip_first_row)
+        for phase, step in (("load", None), ("profile", dataset.unique_counts),
+                            ("index", dataset.build_indexes), ("stats", dataset.column_stats)):
+            if step is not None:
+                step()
+            now = time.perf_counter()
+            timings[phase] = now - last
+            last = now
+    except Exception as e:
+        _status[source] = {"state": "failed", "seconds": time.perf_counter() - start, "error": str(e)}
+        logger.warning("Warm-up of %s failed after %.2fs: %s", source, time.perf_counter() - start, e)
+        return
+    seconds = time.perf_counter() - start
+    _status[source] = {"state": "ready", "seconds": seconds, "rows": len(dataset), **timings}
+    logger.info("Warmed %s: %d rows x %d columns in %.2fs (%s)", source, len(dataset), dataset.frame.shape[1],
+                seconds, ", ".join(f"{phase} {value:.2f}s" for phase, value in timings.items()))
+
+
+# Start warming the sheets once per process; later calls are no-ops
+def start(sources=None, skip_first_row=True):
+    global _started
+    sources = settings.WARMUP_SHEETS if sources is None else sources
+    with _lock:
+        if _started:
+            return _threads
+        _started = True
+        for index, source in enumerate(sources):
+            thread = threading.Thread(target=warm, args=(source, skip_first_row), name=f"warmup-{index}", daemon=True)
+            thread.start()
+            _threads.append(thread)
+    if sources:
+        logger.info("Warming up %d sheet(s) in the background", len(sources))
+    return _threads
+
+
+# Block until warm-up finishes (or the timeout passes); True when done
+def wait(timeout=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for thread in list(_threads):
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    return not any(thread.is_alive() for thread in _threads)
+
+
+def status():
+    return dict(_status)
+
+
+def _gauges():
+    states = [entry["state"] for entry in _status.values()]
+    return {
+        "sources": len(_threads),
+        "ready": states.count("ready"),
+        "failed": states.count("failed"),
+        "seconds": max((entry.get("seconds", 0.0) for entry in _status.values()), default=0.0),
+    }
+
+
+metrics.register_gauges("warmup", _gauges)